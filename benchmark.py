@@ -0,0 +1,554 @@
+"""
+Description : This is the source code for the benchmarks of the Motor Driver. They run without a
+              LabJack: a LoopbackUE9Server answers feedback/timerCounter packets on a local TCP
+              socket (127.0.0.1) with a set delay, in front of a SimulatedUE9Backend, and the
+              MotorController talks to it through a LoopbackUE9Backend.
+
+              BENCHMARK         |   Measures
+              --------------------------------------
+              startup           |   MotorController connect + first input scan (and the GUI)
+              pollRate          |   E-Brake/Reset input scans per second (and with a slow GUI,
+                                |   queued or blocking the I/O thread like a Tk call)
+              brakeLatency      |   E-Brake pressed on the UE9 -> motor not driven
+              speedCommands     |   slider updates offered vs Timer Value updates on the UE9
+              directionLatency  |   setDirection -> new direction driven on the UE9
+
+              The results are written as JSON, so two versions can be compared:
+
+              python benchmark.py --delay 1 --output new.json
+              python benchmark.py --delay 1 --compare old.json
+"""
+
+import argparse                                                             # Library for the command line
+import functools                                                            # Library for the backend class
+import json                                                                 # Library for the packets/results
+import platform                                                             # Library for the result details
+import queue                                                                # Library for the slow GUI thread
+import socket                                                               # Library for the loopback UE9
+import statistics                                                           # Library for the result summary
+import subprocess                                                           # Library for the git version
+import sys                                                                  # Library for the exit code
+import threading                                                            # Library for the loopback server
+import time                                                                 # Library for the timing
+from instrumentation import configureLogging                                # Library for the console log
+from motor_backend import MotorDriverBackend, SimulatedUE9Backend           # Library for LabJack communication
+from motor_controller import MotorController                                # Library for the motor control core
+
+
+class LoopbackUE9Server:
+    calls = ("feedback", "timerCounter", "setTimer0Value")                  # Variable for the packets answered
+    # delay                     Passed in the __init__ method               # Variable for the answer delay
+    # device                    Created in the __init__ method              # Variable for the simulated UE9
+    # port                      Created in the __init__ method              # Variable for the TCP port
+
+    def __init__(self, delay=1.0):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the LoopbackUE9Server object and opens its
+        TCP port on 127.0.0.1 (a free one)
+        :param delay: This is the time the UE9 takes to answer a packet in
+                      milli seconds (on top of the loopback round trip)
+        """
+        self.delay = delay                                                  # Set the answer delay
+        self.device = SimulatedUE9Backend(latency=0)                        # The UE9 behind the socket
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))                                 # Take a free port
+        self._socket.listen()
+        self.port = self._socket.getsockname()[1]                           # Hold the port number
+        self._running = False                                               # The server is not running
+
+    def start(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start answering connections
+        """
+        self._running = True                                                # Set the server as running
+        threading.Thread(target=self._accept, name="LoopbackUE9",
+                         daemon=True).start()                               # Start the accept thread
+
+    def stop(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop answering and close the TCP port
+        """
+        self._running = False                                               # Set the server as stopped
+        self._socket.close()                                                # Close the TCP port
+
+    def _accept(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to answer every new connection on its own thread
+        """
+        while self._running:                                                # While the server is running
+            try:
+                connection, address = self._socket.accept()                 # Wait for a connection
+            except OSError:                                                 # If the port was closed
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(connection,),
+                             daemon=True).start()                           # Answer it on its own thread
+
+    def _serve(self, connection):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to answer the packets of one connection. Each
+        packet is a JSON line {"call": ..., "kwargs": {...}}
+        :param connection: This is the connected socket
+        """
+        with connection, connection.makefile("rwb") as stream:
+            for line in stream:                                             # For every packet
+                request = json.loads(line)
+                if self.delay > 0:                                          # If the UE9 takes time to answer
+                    time.sleep(self.delay / 1000)
+                if request["call"] in self.calls:                           # If it is a UE9 packet
+                    reply = {"result": getattr(self.device, request["call"])(**request["kwargs"])}
+                else:
+                    reply = {"error": "Unknown call: " + str(request["call"])}
+                stream.write(json.dumps(reply).encode() + b"\n")            # Send the answer
+                stream.flush()
+# End of Class
+
+
+class LoopbackUE9Backend(MotorDriverBackend):
+    # port                      Passed in the __init__ method               # Variable for the TCP port
+
+    def __init__(self, port):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the LoopbackUE9Backend object (not connected)
+        :param port: This is the TCP port of the LoopbackUE9Server
+        """
+        self.port = port                                                    # Set the TCP port
+        self.ipAddress = None                                               # Start with no IP Address
+        self._connection = None                                             # Start with no connection
+        self._stream = None
+
+    def connect(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to open the TCP connection to the server
+        :param ipAddress: This is the IP Address of the server (127.0.0.1)
+        """
+        self._connection = socket.create_connection((ipAddress, self.port), 1.0)
+        self._connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._connection.makefile("rwb")
+        self.ipAddress = ipAddress                                          # Hold the IP Address
+
+    def feedback(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a feedback packet over the socket
+        :param kwargs: These are the LabJackPython feedback values
+        :return: The feedback dictionary
+        """
+        return self._call("feedback", kwargs)
+
+    def timerCounter(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a timer/counter packet over the socket
+        :param kwargs: These are the LabJackPython timerCounter values
+        :return: The timerCounter dictionary
+        """
+        return self._call("timerCounter", kwargs)
+
+    def setTimer0Value(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a Timer0 value packet over the socket
+        :param value: This is the new Timer0 value
+        :return: The timerCounter dictionary
+        """
+        return self._call("setTimer0Value", {"value": value})
+
+    def close(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to close the TCP connection
+        """
+        if self._connection is not None:                                    # If it is connected
+            self._stream.close()
+            self._connection.close()                                        # Close the TCP connection
+            self._connection = None
+
+    def _call(self, call, kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send one packet and wait for its answer
+        :param call: This is the name of the UE9 packet
+        :param kwargs: These are the packet values
+        :return: The answer dictionary
+        """
+        self._stream.write(json.dumps({"call": call, "kwargs": kwargs}).encode() + b"\n")
+        self._stream.flush()                                                # Send the packet
+        line = self._stream.readline()                                      # Wait for the answer
+        if not line:                                                        # If the server closed
+            raise ConnectionError("Loopback UE9 closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:                                                # If the server refused it
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+# End of Class
+
+
+class SlowGuiThread:
+    # cost                      Passed in the __init__ method               # Variable for the GUI callback time
+    # blocking                  Passed in the __init__ method               # Variable for the caller waiting
+
+    def __init__(self, cost, blocking=False):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the SlowGuiThread object, a stand-in for
+        the Tk main loop where every callback takes a set time
+        :param cost: This is the time every callback takes in milli seconds
+        :param blocking: This is True if deliver waits until the GUI thread
+                         has run the callback, like calling Tk (e.g.
+                         after_idle) from another thread. It's value is
+                         False for a queue the GUI polls (MotorDriver.deliver)
+        """
+        self.cost = cost                                                    # Set the GUI callback time
+        self.blocking = blocking                                            # Set the caller waiting
+        self._callbacks = queue.Queue()                                     # Start with no callbacks waiting
+        threading.Thread(target=self._run, name="SlowGui", daemon=True).start()
+
+    def deliver(self, function, *args):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to queue a callback. If the GUI is blocking
+        it waits until the GUI thread has run it (after any slow callback
+        already running)
+        :param function: This is the function to call on the GUI thread
+        :param args: These are the values passed to the function
+        """
+        done = threading.Event()
+        self._callbacks.put((function, args, done))
+        if self.blocking:                                                   # If the caller waits for the GUI
+            done.wait()
+
+    def _run(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run the callbacks, each taking the set time
+        """
+        while True:
+            function, args, done = self._callbacks.get()                    # Wait for the next callback
+            function(*args)                                                 # Run it
+            done.set()                                                      # Let a blocked caller go on
+            time.sleep(self.cost / 1000)                                    # Take the GUI callback time
+# End of Class
+
+
+def summary(values):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to summarize a list of times
+    :param values: These are the times in milli seconds
+    :return: A dictionary with the count, mean, median, p95 and max
+    """
+    if not values:                                                          # If nothing was measured
+        return {"count": 0}
+    ordered = sorted(values)
+    return {"count": len(ordered),
+            "meanMs": round(statistics.mean(ordered), 3),
+            "medianMs": round(statistics.median(ordered), 3),
+            "p95Ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+            "maxMs": round(ordered[-1], 3)}
+
+
+def newController(server, deliver=None, **settings):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to create a MotorController on the loopback UE9
+    :param server: This is the LoopbackUE9Server
+    :param deliver: This is the GUI thread handoff (None -> I/O thread)
+    :param settings: These are MotorController settings, e.g. inputScanRate
+    :return: The MotorController (not connected)
+    """
+    controller = MotorController(functools.partial(LoopbackUE9Backend, server.port), deliver)
+    controller.autoReconnect = False                                        # A benchmark never reconnects
+    for setting, value in settings.items():                                 # For every setting
+        setattr(controller, setting, value)
+    return controller
+
+
+def waitFor(condition, timeout=2.0):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to wait until a condition is true
+    :param condition: This is a function that returns True when done
+    :param timeout: This is the longest wait in seconds
+    :return: True if the condition became true in time
+    """
+    endTime = time.monotonic() + timeout
+    while time.monotonic() < endTime:                                       # Until the timeout
+        if condition():                                                     # If it is done
+            return True
+        time.sleep(0.0002)
+    return False
+
+
+def logEntryAfter(device, startTime, match):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to find the first UE9 output change after a time
+    :param device: This is the SimulatedUE9Backend
+    :param startTime: This is the time.monotonic() to look after
+    :param match: This is a function that takes an outputLog entry
+    :return: The time of the first matching entry (None if there is none)
+    """
+    for entry in list(device.outputLog):                                    # For every output change
+        if entry[0] >= startTime and match(entry):                          # If it is the one looked for
+            return entry[0]
+    return None
+
+
+def benchmarkStartup(server, arguments):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to time the controller startup (and the GUI's
+    if Tk and a display are there)
+    :return: A dictionary with the startup times
+    """
+    connectTimes, firstScanTimes = [], []
+    for repeat in range(arguments.repeat):                                  # For every repeat
+        startTime = time.perf_counter()
+        controller = newController(server, inputScanRate=arguments.scan_rate)
+        controller.connect("127.0.0.1")                                     # Connect and start the I/O thread
+        connectTimes.append((time.perf_counter() - startTime) * 1000)
+        waitFor(lambda: controller.inputScanner.packetsSent > 0)            # Wait for the first input scan
+        firstScanTimes.append((time.perf_counter() - startTime) * 1000)
+        controller.close()
+    results = {"connect": summary(connectTimes), "firstScan": summary(firstScanTimes)}
+    try:
+        from motor_driver_gui import MotorDriver                            # The GUI needs Tk
+        startTime = time.perf_counter()
+        gui = MotorDriver(functools.partial(LoopbackUE9Backend, server.port))
+        gui.window.update()                                                 # Show the window
+        results["guiWindowMs"] = round((time.perf_counter() - startTime) * 1000, 3)
+        gui.terminateProgram()
+    except Exception:                                                       # If there is no Tk or no display
+        results["guiWindowMs"] = None
+    return results
+
+
+def benchmarkPollRate(server, arguments, guiCost=None, blocking=False):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to measure the input scans per second
+    :param guiCost: This is the GUI callback time in milli seconds (None ->
+                    the checks run on the I/O thread, no GUI)
+    :param blocking: This is True if the handoff waits for the GUI thread
+    :return: A dictionary with the requested and measured scan rates
+    """
+    deliver = None if guiCost is None else SlowGuiThread(guiCost, blocking).deliver
+    controller = newController(server, deliver, inputScanRate=arguments.scan_rate)
+    controller.connect("127.0.0.1")
+    time.sleep(0.2)                                                         # Let the I/O thread settle
+    scanner = controller.inputScanner
+    startPackets, startTime = scanner.packetsSent, time.monotonic()
+    time.sleep(arguments.duration)                                          # Scan for the duration
+    scans = scanner.packetsSent - startPackets
+    elapsed = time.monotonic() - startTime
+    histogram = controller.instrumentation.histogram("scanInterval")
+    controller.close()
+    return {"requestedPerSecond": arguments.scan_rate,
+            "measuredPerSecond": round(scans / elapsed, 2),
+            "scanIntervalP50Ms": round(histogram.percentile(0.5) * 1000, 3),
+            "scanIntervalP99Ms": round(histogram.percentile(0.99) * 1000, 3),
+            "scanIntervalMaxMs": round((histogram.maximum or 0.0) * 1000, 3)}
+
+
+def benchmarkBrakeLatency(server, arguments):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to time the E-Brake press on the UE9 -> motor not
+    driven, over several presses. Each press waits until the controller
+    has turned the motor off, so the next Reset can't race the old press
+    :return: A dictionary with the latency summary and the presses skipped
+             (the motor was not driven, or the stop was not seen)
+    """
+    device = server.device
+    controller = newController(server, inputScanRate=arguments.scan_rate)
+    controller.connect("127.0.0.1")
+    latencies = []
+    skipped = 0                                                             # Start with no presses skipped
+    for repeat in range(arguments.repeat):                                  # For every press
+        device.setInputs()                                                  # Release every input
+        if repeat:                                                          # If the E-Brake was pressed before
+            controller.confirmReset(controller.resetPassword)               # Reset it
+        else:
+            controller.turnOn()
+        controller.setDirection(MotorController.FORWARD)
+        if not waitFor(device.motorDriven):                                 # If the motor is not driven
+            skipped += 1                                                    # Count the press not made
+            continue
+        time.sleep(0.05)
+        startTime = time.monotonic()
+        device.setInputs(brakePressed=True)                                 # Press the E-Brake on the UE9
+        waitFor(lambda: not device.motorDriven())
+        stopTime = logEntryAfter(device, startTime, lambda entry: not entry[4])
+        if stopTime is not None:                                            # If the motor was stopped
+            latencies.append((stopTime - startTime) * 1000)
+        else:
+            skipped += 1                                                    # Count the press not timed
+        waitFor(lambda: controller.eBrakePressed and not controller.motorRunning)   # Let the checks turn it off
+    device.setInputs()
+    controller.close()
+    result = summary(latencies)
+    result["skipped"] = skipped                                             # Report the presses skipped
+    return result
+
+
+def benchmarkSpeedCommands(server, arguments):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to drag the speed "slider" as fast as a GUI can
+    (one value per milli second) and count what reaches the UE9
+    :return: A dictionary with the offered and written updates per second
+    """
+    device = server.device
+    controller = newController(server, inputScanRate=arguments.scan_rate)
+    controller.connect("127.0.0.1")
+    controller.turnOn()
+    controller.setDirection(MotorController.FORWARD)
+    waitFor(device.motorDriven)
+    startTime = time.monotonic()
+    offered = 0
+    while time.monotonic() - startTime < arguments.duration:                # For the duration
+        controller.setDutyCycle(30 + offered % 71)                          # Move the slider one step
+        offered += 1
+        time.sleep(0.001)
+    elapsed = time.monotonic() - startTime
+    time.sleep(0.1)                                                         # Let the last value be written
+    outputLog = list(device.outputLog)
+    written = sum(1 for previous, entry in zip(outputLog, outputLog[1:])
+                  if entry[0] >= startTime and entry[3] != previous[3])     # Timer Value changes on the UE9
+    coalescer = controller.speedCoalescer
+    controller.close()
+    return {"offeredPerSecond": round(offered / elapsed, 1),
+            "writtenPerSecond": round(written / elapsed, 1),
+            "minIntervalMs": coalescer.minInterval,
+            "updatesDropped": coalescer.updatesDropped,
+            "updatesSkipped": coalescer.updatesSkipped}
+
+
+def benchmarkDirectionLatency(server, arguments):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to time setDirection -> the new direction driven
+    on the UE9 (this includes the H-Bridge dead time)
+    :return: A dictionary with the latency summary and the dead time
+    """
+    device = server.device
+    controller = newController(server, inputScanRate=arguments.scan_rate)
+    controller.connect("127.0.0.1")
+    controller.turnOn()
+    latencies = []
+    for repeat in range(arguments.repeat):                                  # For every direction change
+        direction = (MotorController.BACKWARD if repeat % 2 else MotorController.FORWARD)
+        pins = MotorController.directionStates[direction]
+        startTime = time.monotonic()
+        controller.setDirection(direction)                                  # Change the direction
+        waitFor(lambda: device.fioOutputs == pins and device.motorDriven())
+        driveTime = logEntryAfter(device, startTime,
+                                  lambda entry: entry[1] == pins and entry[4])
+        if driveTime is not None:                                           # If the direction is driven
+            latencies.append((driveTime - startTime) * 1000)
+        time.sleep(0.05)
+    controller.close()
+    results = summary(latencies)
+    results["deadTimeMs"] = controller.directionDeadTime
+    return results
+
+
+def compareResults(old, new, prefix=""):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to print the change of every number between two
+    result dictionaries
+    :param old: This is the older results
+    :param new: This is the newer results
+    :param prefix: This is the name of the enclosing result
+    """
+    for key, value in new.items():                                          # For every result
+        name = prefix + key
+        if isinstance(value, dict) and isinstance(old.get(key), dict):      # If it holds more results
+            compareResults(old[key], value, name + ".")
+        elif isinstance(value, (int, float)) and isinstance(old.get(key), (int, float)):
+            change = (value - old[key]) / old[key] * 100 if old[key] else 0.0
+            print("%-45s %12s -> %12s  (%+.1f%%)" % (name, old[key], value, change))
+
+
+def gitVersion():
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to get the git version of the code benchmarked
+    :return: The git describe text (None outside a git checkout)
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, timeout=5,
+                              check=True).stdout.strip()
+    except Exception:                                                       # If git is not there
+        return None
+
+
+def main(argv=None):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is the command line entry point. It runs every benchmark
+    against the loopback UE9 and writes the results as JSON
+    :param argv: These are the command line arguments (sys.argv if None)
+    :return: The exit code (0 -> OK)
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Motor Driver without a LabJack")
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="milli seconds the loopback UE9 takes to answer a packet")
+    parser.add_argument("--duration", type=float, default=2.0,
+                        help="seconds each rate benchmark runs")
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="number of brake presses / direction changes / startups")
+    parser.add_argument("--scan-rate", type=int, default=MotorController.inputScanRate,
+                        help="E-Brake/Reset input scans per second asked for")
+    parser.add_argument("--gui-cost", type=float, default=20.0,
+                        help="milli seconds every GUI callback takes (slow GUI poll rate)")
+    parser.add_argument("--output", help="write the JSON results here (stdout if not given)")
+    parser.add_argument("--compare", help="JSON results of an older run to compare with")
+    arguments = parser.parse_args(argv)
+    configureLogging("ERROR")                                               # Keep the console quiet
+
+    server = LoopbackUE9Server(arguments.delay)
+    server.start()
+    try:
+        results = {"startup": benchmarkStartup(server, arguments),
+                   "pollRate": benchmarkPollRate(server, arguments),
+                   "pollRateSlowGui": benchmarkPollRate(server, arguments, arguments.gui_cost),
+                   "pollRateBlockingGui": benchmarkPollRate(server, arguments,
+                                                            arguments.gui_cost, True),
+                   "brakeLatency": benchmarkBrakeLatency(server, arguments),
+                   "speedCommands": benchmarkSpeedCommands(server, arguments),
+                   "directionLatency": benchmarkDirectionLatency(server, arguments)}
+    finally:
+        server.stop()
+    report = {"version": gitVersion(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "settings": {"delayMs": arguments.delay, "durationSec": arguments.duration,
+                           "repeat": arguments.repeat, "scanRate": arguments.scan_rate,
+                           "guiCostMs": arguments.gui_cost},
+              "results": results}
+    text = json.dumps(report, indent=2)
+    if arguments.output:                                                    # If a results file was asked for
+        with open(arguments.output, "w") as resultsFile:
+            resultsFile.write(text + "\n")
+    else:
+        print(text)
+    if arguments.compare:                                                   # If there are older results
+        with open(arguments.compare) as oldFile:
+            compareResults(json.load(oldFile)["results"], results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
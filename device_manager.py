@@ -0,0 +1,216 @@
+"""
+Description : This is the source code for driving several motors on several LabJack UE9s from
+              one process. Every device is a MotorController with its own UE9 I/O thread,
+              command queue and state, so the E-Brake/Reset inputs of every UE9 are scanned in
+              parallel and a slow (or lost) UE9 never holds up the others.
+
+              python device_manager.py --simulate 10.0.0.1 10.0.0.2 10.0.0.3 --duration 5
+"""
+
+import argparse                                                             # Library for the command line
+import sys                                                                  # Library for the exit code
+import time                                                                 # Library for the status timing
+from concurrent.futures import ThreadPoolExecutor                           # Library for the parallel connects
+from instrumentation import configureLogging, writeTextFile                 # Library for the console log
+from motor_backend import SimulatedUE9Backend, UE9Backend                   # Library for LabJack communication
+from motor_controller import MotorController                                # Library for the motor control core
+
+
+class DeviceManager:
+    # deliver                   Passed in the __init__ method               # Variable for the GUI thread handoff
+    # devices                   Created in the __init__ method              # Variable for the controllers by name
+    # ipAddresses               Created in the __init__ method              # Variable for the IP Address by name
+
+    def __init__(self, deliver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the DeviceManager object with no devices
+        :param deliver: This is a function used to run the input checks of
+                        every device on the GUI thread without waiting for
+                        it, e.g. a queue the Tk GUI polls.
+                        It's value is None to run them on each I/O thread
+        """
+        self.deliver = deliver                                              # Hold the GUI thread handoff
+        self.devices = {}                                                   # Start with no devices
+        self.ipAddresses = {}                                               # Start with no IP Addresses
+
+    def addDevice(self, name, ipAddress, backendClass=UE9Backend, **settings):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a motor on a UE9 (not connected yet)
+        :param name: This is the name used to find the device
+        :param ipAddress: This is the IP Address of the UE9
+        :param backendClass: This is the MotorDriverBackend class to use
+        :param settings: These are MotorController settings for this device
+                         only, e.g. inputScanRate=200, directionDeadTime=50
+        :return: The MotorController of the device
+        """
+        if name in self.devices:                                            # If the name is already used
+            raise ValueError("Device already added: " + str(name))
+        controller = MotorController(backendClass, self.deliver)            # Create the motor control core
+        controller.instrumentation.labels["device"] = name                  # Label its timing numbers
+        for setting, value in settings.items():                             # For every device setting
+            if not hasattr(MotorController, setting):                       # If it is not a controller setting
+                raise ValueError("Unknown MotorController setting: " + setting)
+            setattr(controller, setting, value)                             # Set it on this device only
+        self.devices[name] = controller                                     # Hold the device by name
+        self.ipAddresses[name] = ipAddress                                  # Hold its IP Address
+        return controller
+
+    def device(self, name):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the controller of a device
+        :param name: This is the name of the device
+        :return: The MotorController of the device
+        """
+        return self.devices[name]
+
+    def connectAll(self, timeout=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to connect to every UE9 at the same time. A
+        slow UE9 only delays its own result
+        :param timeout: This is the longest wait for all the results in
+                        seconds (None waits for every attempt)
+        :return: A dictionary with True/False (connected) for every name
+        """
+        names = list(self.devices)                                          # Get every device name
+        if not names:                                                       # If there are no devices
+            return {}
+        pool = ThreadPoolExecutor(max_workers=len(names),
+                                  thread_name_prefix="LabJackConnect")      # One connect thread per device
+        futures = {name: pool.submit(self.devices[name].connect,
+                                     self.ipAddresses[name])
+                   for name in names}                                       # Start every connect attempt
+        results = {}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name, future in futures.items():                                # For every connect attempt
+            wait = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                results[name] = future.result(wait)                         # Get the connect result
+            except Exception:                                               # If it failed or took too long
+                results[name] = False
+        pool.shutdown(wait=False)                                           # Let the slow attempts finish alone
+        return results
+
+    def forEach(self, command, *args):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to call a MotorController method on every
+        connected device. The commands are only queued, so this returns at once
+        :param command: This is the name of the method, e.g. "turnOff"
+        :param args: These are the values passed to the method
+        :return: A dictionary with the result for every connected name
+        """
+        return {name: getattr(controller, command)(*args)
+                for name, controller in self.devices.items()
+                if controller.labJackWorker is not None}
+
+    def turnOffAll(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn every motor driver circuit OFF
+        """
+        self.forEach("turnOff", True)                                       # Turn off and forget the directions
+
+    def status(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the state of every device
+        :return: A dictionary with the status dictionary of every name
+        """
+        return {name: dict(controller.status(), ip=self.ipAddresses[name])
+                for name, controller in self.devices.items()}
+
+    def prometheusText(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the timing numbers of every device in
+        one Prometheus text (every metric is labelled with the device name).
+        The lines of every device are grouped under one TYPE line per
+        metric, as the text format needs each metric family in one place
+        :return: The Prometheus text
+        """
+        families = {}                                                       # Metric TYPE line -> sample lines
+        for controller in self.devices.values():                            # For every device
+            samples = None
+            for line in controller.instrumentation.prometheusText().splitlines():
+                if line.startswith("# TYPE"):                               # If a new metric family starts
+                    samples = families.setdefault(line, [])                 # Add to it (any device's lines)
+                elif samples is not None:                                   # If it is a sample line
+                    samples.append(line)
+        lines = []
+        for typeLine, samples in families.items():                          # For every metric family
+            lines.append(typeLine)                                          # Write its TYPE line once
+            lines.extend(samples)                                           # Then every device's samples
+        return "\n".join(lines) + "\n"
+
+    def writePrometheus(self, path):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the timing numbers of every device as
+        one Prometheus text file (replaced in one step)
+        :param path: This is the path of the file
+        """
+        writeTextFile(path, self.prometheusText())                          # Write the Prometheus text
+
+    def closeAll(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn every motor OFF and stop every UE9 I/O
+        thread. The devices are closed at the same time
+        """
+        if not self.devices:                                                # If there are no devices
+            return
+        with ThreadPoolExecutor(max_workers=len(self.devices)) as pool:
+            for controller in self.devices.values():                        # For every device
+                pool.submit(controller.close)                               # Turn OFF and stop its I/O thread
+# End of Class
+
+
+def main(argv=None):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is the command line entry point. It connects to every
+    UE9 and prints the input scan rate of each one every second
+    :param argv: These are the command line arguments (sys.argv if None)
+    :return: The exit code (0 -> every UE9 connected, 1 -> otherwise)
+    """
+    parser = argparse.ArgumentParser(description="Scan several LabJack UE9 motor drivers")
+    parser.add_argument("ip", nargs="+", help="IP Address of every LabJack UE9")
+    parser.add_argument("--simulate", action="store_true",
+                        help="use simulated UE9s instead of the LabJacks")
+    parser.add_argument("--duration", type=float, default=5.0,
+                        help="seconds to scan before turning every motor OFF")
+    parser.add_argument("--scan-rate", type=int, default=MotorController.inputScanRate,
+                        help="E-Brake/Reset input scans per second (per device)")
+    parser.add_argument("--metrics-file",
+                        help="write the timing numbers here (Prometheus text) every second")
+    arguments = parser.parse_args(argv)
+    configureLogging()                                                      # Write the log to the console
+
+    manager = DeviceManager()
+    for number, ipAddress in enumerate(arguments.ip):                       # For every IP Address
+        manager.addDevice("motor" + str(number), ipAddress,
+                          SimulatedUE9Backend if arguments.simulate else UE9Backend,
+                          inputScanRate=arguments.scan_rate)                # Add the device
+    results = manager.connectAll()                                          # Connect to every UE9
+    try:
+        endTime = time.monotonic() + arguments.duration
+        while time.monotonic() < endTime:                                   # Until the duration is over
+            time.sleep(1.0)                                                 # Wait a second
+            for name, state in manager.status().items():                    # For every device
+                print(name, state["ip"], "connected" if state["connected"] else "NOT connected",
+                      "%.1f scans/s" % state["packetsPerSecond"])           # Console -> print the scan rate
+            if arguments.metrics_file:                                      # If a metrics file was asked for
+                manager.writePrometheus(arguments.metrics_file)             # Write the Prometheus text file
+    except KeyboardInterrupt:                                               # If Ctrl+C was pressed
+        pass
+    finally:
+        manager.closeAll()                                                  # Turn OFF and stop every I/O thread
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
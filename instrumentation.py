@@ -0,0 +1,395 @@
+"""
+Description : This is the source code for the timing numbers and the console log of the Motor
+              Driver. It records how long every feedback/timerCounter packet takes, how often the
+              inputs are really scanned compared to the scan rate asked for, and how long the
+              E-Brake takes from being read to the motor being off.
+
+              NAME                  |   Measures
+              --------------------------------------
+              feedback              |   feedback packet round trip
+              timerCounter          |   timerCounter packet round trip
+              scanInterval          |   time between two input scans
+              brakeToMotorOff       |   E-Brake read -> OFF packets sent
+
+              The numbers can be printed as a short text dump or written as a Prometheus text file.
+              The log is a levelled logger (logger) with a rate limit, so a flood of the same
+              message (e.g. a lost UE9) can't slow the I/O thread down.
+"""
+
+import logging                                                              # Library for the levelled log
+import os                                                                   # Library for the metrics file
+import threading                                                            # Library for the histogram lock
+import time                                                                 # Library for the rate limit clock
+
+
+class RateLimitFilter(logging.Filter):
+    # interval                  Passed in the __init__ method               # Variable for the rate limit window
+    # burst                     Passed in the __init__ method               # Variable for the messages per window
+
+    def __init__(self, interval=1.0, burst=5):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the RateLimitFilter object. Each message
+        (same level and text) is let through at most burst times per interval
+        :param interval: This is the rate limit window in seconds
+        :param burst: This is the number of messages let through per window
+        """
+        super().__init__()
+        self.interval = interval                                            # Set the rate limit window
+        self.burst = burst                                                  # Set the messages per window
+        self._windows = {}                                                  # Window start, count, suppressed
+        self._lock = threading.Lock()                                       # Lock for the windows
+
+    def filter(self, record):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to decide if a log message is written
+        :param record: This is the log record
+        :return: True if the message is written
+        """
+        key = (record.levelno, record.msg)                                  # Messages are counted by template
+        now = time.monotonic()                                              # Get the current time
+        with self._lock:
+            start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.interval:                                # If a new window started
+                if suppressed:                                              # If messages were suppressed
+                    record.msg = str(record.msg) + " (%d more suppressed)" % suppressed
+                start, count, suppressed = now, 0, 0                        # Start a new window
+            if count >= self.burst:                                         # If the window is full
+                self._windows[key] = (start, count, suppressed + 1)         # Count the suppressed message
+                return False
+            self._windows[key] = (start, count + 1, suppressed)             # Count the written message
+        return True
+# End of Class
+
+
+logger = logging.getLogger("motor_driver")                                  # The Motor Driver log
+logger.addFilter(RateLimitFilter())                                         # Rate limit every message
+
+
+def configureLogging(level="INFO"):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to write the Motor Driver log to the console
+    :param level: This is the lowest level written (DEBUG shows every duty
+                  cycle change)
+    """
+    logging.basicConfig(format="%(message)s")                               # Write plain messages to the console
+    logger.setLevel(level.upper() if isinstance(level, str) else level)     # Set the lowest level written
+
+
+class LatencyHistogram:
+    bounds = (0.0001, 0.00025, 0.0005, 0.001, 0.0015, 0.002, 0.0025,       # Fine around a UE9 round trip
+              0.005, 0.0075, 0.009, 0.0095, 0.00975, 0.01, 0.01025,         # Fine around the 10 ms scan interval
+              0.0105, 0.011, 0.0125, 0.015, 0.025, 0.05, 0.1, 0.25, 0.5,
+              1.0, 2.5)                                                     # Variable for the bucket limits (sec)
+    # counts                    Created in the __init__ method              # Variable for the bucket counts
+    # count                     Created in the __init__ method              # Variable for the number recorded
+    # total                     Created in the __init__ method              # Variable for the sum recorded
+    # minimum                   Created in the __init__ method              # Variable for the shortest recorded
+    # maximum                   Created in the __init__ method              # Variable for the longest recorded
+
+    def __init__(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the LatencyHistogram object (empty)
+        """
+        self.counts = [0] * (len(self.bounds) + 1)                          # One count per bucket (+ overflow)
+        self.count = 0                                                      # Start with nothing recorded
+        self.total = 0.0                                                    # Start with no time recorded
+        self.minimum = None                                                 # Start with no shortest time
+        self.maximum = None                                                 # Start with no longest time
+        self._lock = threading.Lock()                                       # Lock for the counts
+
+    def record(self, seconds):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a time to the histogram
+        :param seconds: This is the time in seconds
+        """
+        bucket = 0
+        while bucket < len(self.bounds) and seconds > self.bounds[bucket]:  # Find the first bucket that fits
+            bucket += 1
+        with self._lock:
+            self.counts[bucket] += 1                                        # Count it in its bucket
+            self.count += 1                                                 # Count it
+            self.total += seconds                                           # Add it to the sum
+            if self.minimum is None or seconds < self.minimum:              # If it is the shortest yet
+                self.minimum = seconds
+            if self.maximum is None or seconds > self.maximum:              # If it is the longest yet
+                self.maximum = seconds
+
+    def mean(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the average time
+        :return: The average time in seconds (0 if nothing was recorded)
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the bucket limit that a fraction of the
+        times fit under (e.g. 0.99 -> 99% of the times are at most this).
+        A limit above the longest time is cut to it, since nothing recorded
+        is longer
+        :param fraction: This is the fraction from 0 to 1
+        :return: The bucket limit in seconds (at most the maximum)
+        """
+        with self._lock:
+            needed = fraction * self.count                                  # Get the number of times needed
+            running = 0
+            for bucket, count in enumerate(self.counts):                    # For every bucket
+                running += count
+                if running >= needed and running:                           # If enough times fit under it
+                    if bucket < len(self.bounds):                           # If it is not the overflow bucket
+                        return min(self.bounds[bucket], self.maximum)       # The limit, at most the maximum
+                    return self.maximum
+        return 0.0
+# End of Class
+
+
+class Instrumentation:
+    # labels                    Passed in the __init__ method               # Variable for the metric labels
+    # histograms                Created in the __init__ method              # Variable for the histograms by name
+    # gauges                    Created in the __init__ method              # Variable for the gauge functions
+
+    def __init__(self, labels=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the Instrumentation object (no numbers yet)
+        :param labels: This is a dictionary of labels added to every metric
+                       in the Prometheus file, e.g. {"device": "motor0"}
+        """
+        self.labels = dict(labels or {})                                    # Hold the metric labels
+        self.histograms = {}                                                # Start with no histograms
+        self.gauges = {}                                                    # Start with no gauges
+        self._lock = threading.Lock()                                       # Lock for the histograms dictionary
+        self._lastScan = None                                               # The time of the last input scan
+
+    def histogram(self, name):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get (or create) a histogram by name
+        :param name: This is the name of the histogram
+        :return: The LatencyHistogram
+        """
+        with self._lock:
+            if name not in self.histograms:                                 # If it doesn't exist yet
+                self.histograms[name] = LatencyHistogram()                  # Create it
+            return self.histograms[name]
+
+    def record(self, name, seconds):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a time to a histogram
+        :param name: This is the name of the histogram
+        :param seconds: This is the time in seconds
+        """
+        self.histogram(name).record(seconds)                                # Add the time to the histogram
+
+    def recordScan(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to record that an input scan started, the time
+        since the last scan goes to the scanInterval histogram
+        """
+        now = time.monotonic()                                              # Get the current time
+        if self._lastScan is not None:                                      # If there was an earlier scan
+            self.record("scanInterval", now - self._lastScan)               # Record the time between scans
+        self._lastScan = now                                                # Hold the time of this scan
+
+    def addGauge(self, name, function):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a number that is read when exported
+        :param name: This is the name of the gauge
+        :param function: This is a function that returns the number
+        """
+        self.gauges[name] = function                                        # Hold the gauge function
+
+    def dump(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the numbers as a short text
+        :return: One line per histogram and one line with every gauge
+        """
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):             # For every histogram
+            if not histogram.count:                                         # If nothing was recorded
+                continue
+            lines.append("%s n=%d mean=%.2fms p50<=%.2fms p99<=%.2fms max=%.2fms" % (
+                name, histogram.count, histogram.mean() * 1000,
+                histogram.percentile(0.5) * 1000, histogram.percentile(0.99) * 1000,
+                histogram.maximum * 1000))
+        gauges = ["%s=%s" % (name, _number(value)) for name, value in self._readGauges()]
+        if gauges:                                                          # If there are gauges
+            lines.append(" ".join(gauges))
+        return "\n".join(lines)
+
+    def prometheusText(self, prefix="motor_driver"):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the numbers in the Prometheus text format
+        :param prefix: This is the prefix of every metric name
+        :return: The Prometheus text
+        """
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):             # For every histogram
+            metric = "%s_%s_seconds" % (prefix, _snakeCase(name))
+            lines.append("# TYPE %s histogram" % metric)
+            running = 0
+            for bucket, limit in enumerate(histogram.bounds):               # For every bucket limit
+                running += histogram.counts[bucket]                         # Buckets count everything under them
+                lines.append("%s_bucket%s %d" % (metric, self._labelText(le=repr(limit)), running))
+            lines.append("%s_bucket%s %d" % (metric, self._labelText(le="+Inf"), histogram.count))
+            lines.append("%s_sum%s %r" % (metric, self._labelText(), histogram.total))
+            lines.append("%s_count%s %d" % (metric, self._labelText(), histogram.count))
+        for name, value in self._readGauges():                              # For every gauge
+            metric = "%s_%s" % (prefix, _snakeCase(name))
+            lines.append("# TYPE %s gauge" % metric)
+            lines.append("%s%s %s" % (metric, self._labelText(), _number(value)))
+        return "\n".join(lines) + "\n"
+
+    def writePrometheus(self, path, prefix="motor_driver"):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the Prometheus text file. The file is
+        replaced in one step, so a reader never sees half of it
+        :param path: This is the path of the file (e.g. for node_exporter)
+        :param prefix: This is the prefix of every metric name
+        """
+        writeTextFile(path, self.prometheusText(prefix))                    # Write the Prometheus text
+
+    def _readGauges(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read every gauge. A gauge that fails is
+        skipped
+        :return: A list of (name, value) in name order
+        """
+        values = []
+        for name, function in sorted(self.gauges.items()):                  # For every gauge
+            try:
+                values.append((name, function()))                           # Read the gauge
+            except Exception:                                               # If it can't be read right now
+                continue
+        return values
+
+    def _labelText(self, **extra):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the Prometheus label text of a metric
+        :param extra: These are labels for this line only (e.g. le)
+        :return: The label text, e.g. {device="motor0",le="0.001"}
+        """
+        labels = dict(self.labels, **extra)
+        if not labels:                                                      # If there are no labels
+            return ""
+        return "{" + ",".join('%s="%s"' % (key, value) for key, value in labels.items()) + "}"
+# End of Class
+
+
+class InstrumentedBackend:
+    # backend                   Passed in the __init__ method               # Variable for the timed backend
+    # instrumentation           Passed in the __init__ method               # Variable for the histograms
+
+    def __init__(self, backend, instrumentation):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the InstrumentedBackend object that times
+        every feedback and timerCounter packet of a MotorDriverBackend.
+        Everything else is passed straight to the backend
+        :param backend: This is the MotorDriverBackend to time
+        :param instrumentation: This is the Instrumentation to record into
+        """
+        self.backend = backend                                              # Hold the timed backend
+        self.instrumentation = instrumentation                              # Hold the histograms
+
+    def feedback(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send (and time) a feedback packet
+        :param kwargs: These are the LabJackPython feedback values
+        :return: The feedback dictionary
+        """
+        start = time.perf_counter()                                         # Start the packet timer
+        try:
+            return self.backend.feedback(**kwargs)
+        finally:
+            self.instrumentation.record("feedback", time.perf_counter() - start)
+
+    def timerCounter(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send (and time) a timerCounter packet
+        :param kwargs: These are the LabJackPython timerCounter values
+        :return: The timerCounter dictionary
+        """
+        start = time.perf_counter()                                         # Start the packet timer
+        try:
+            return self.backend.timerCounter(**kwargs)
+        finally:
+            self.instrumentation.record("timerCounter", time.perf_counter() - start)
+
+    def setTimer0Value(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send (and time) a Timer0 value packet. It is
+        a timerCounter packet, so it is recorded as one
+        :param value: This is the new Timer0 value
+        :return: The timerCounter dictionary
+        """
+        start = time.perf_counter()                                         # Start the packet timer
+        try:
+            return self.backend.setTimer0Value(value)
+        finally:
+            self.instrumentation.record("timerCounter", time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)                                  # Pass everything else to the backend
+
+    def __setattr__(self, name, value):
+        if name in ("backend", "instrumentation"):                          # If it is a wrapper variable
+            object.__setattr__(self, name, value)
+        else:                                                               # If it is a backend variable
+            setattr(self.backend, name, value)                              # Set it on the backend (e.g. linkUp)
+# End of Class
+
+
+def writeTextFile(path, text):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to write a text file that is replaced in one
+    step (a temporary file, then os.replace), so a reader never sees half
+    of it
+    :param path: This is the path of the file
+    :param text: This is the text written to it
+    """
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, "w") as textFile:
+        textFile.write(text)                                                # Write the whole text
+    os.replace(temporaryPath, path)                                         # Replace the old file
+
+
+def _snakeCase(name):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to turn a camelCase name into a snake_case name
+    :param name: This is the camelCase name, e.g. brakeToMotorOff
+    :return: The snake_case name, e.g. brake_to_motor_off
+    """
+    return "".join("_" + letter.lower() if letter.isupper() else letter for letter in name)
+
+
+def _number(value):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to write a gauge value as a number
+    :param value: This is the gauge value (bool, int or float)
+    :return: The number as text
+    """
+    if isinstance(value, float):                                            # If it is a float
+        return "%.6g" % value
+    return str(int(value))
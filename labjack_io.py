@@ -0,0 +1,851 @@
+"""
+Description : This is the source code for the input/output helpers used by the Motor Driver
+              to talk to the LabJack UE9. The E-Brake (FIO3) and Reset (FIO4) inputs share the
+              same FIOState byte, so they are read together with a single feedback packet per
+              tick and the decoded bits are handed to every registered handler.
+
+              FIO BIT   |   Used For
+              --------------------------------------
+              0b00001   |   Enable/Disable and PWM
+              0b00010   |   Motor Terminal 1 (Forward)
+              0b00100   |   Motor Terminal 2 (Backward)
+              0b01000   |   Emergency Brake Input
+              0b10000   |   Reset Input
+
+              The LabJackWorker owns the UE9 connection on a background thread. GUI callbacks
+              enqueue commands and return at once, the worker runs them between input scans
+              and passes the latest FIO state back to the GUI thread (e.g. a queue the Tk GUI
+              polls).
+              Fast changing values (the speed slider) go through a CommandCoalescer so only
+              the newest value is written, at most once per minimum interval.
+
+              The MotorOutputs driver layer remembers what is on the UE9. The clock is set up
+              once per connection, speed changes are Timer0Value-only updates and a state change
+              (enable, direction, PWM) is one transaction that only sends the parts that changed.
+              Direction changes go through a DirectionSequencer (coast -> dead time -> drive)
+              that waits on the worker's timers instead of sleeping, so scans keep running.
+
+              A StreamScanner can take the place of the InputScanner. The UE9 then scans the FIO
+              lines on its own clock (e.g. 1000 scans/sec) and each read returns a block of scans.
+              Presses (1 -> 0 edges) are found over the whole block at once and a press is held
+              in the FIO state passed to the handlers, so a pulse shorter than a read is not lost.
+"""
+
+import heapq                                                                # Library for the worker timers
+import itertools                                                            # Library for the timer order count
+import math                                                                 # Library for the stream read interval
+import queue                                                                # Library for the command queue
+import threading                                                            # Library for the I/O worker thread
+import time                                                                 # Library for the packet rate clock
+from instrumentation import logger                                          # Library for the levelled log
+try:
+    import numpy                                                            # Library for the edge detection
+except ImportError:                                                         # If NumPy is not installed
+    numpy = None                                                            # Find the edges in Python
+
+_WAKE = object()                                                            # Queue marker that only wakes the worker
+
+
+class InputScanner:
+    # labJackDriver             Passed in the __init__ method               # Variable for the LabJack connection
+    # tickRate                  Passed in the __init__ method               # Variable for the scans per second
+    # handlers                  Created in the __init__ method              # Variable for the FIO bit handlers
+    # packetsSent               Created in the __init__ method              # Variable for the total packet count
+    # packetsPerSecond          Created in the __init__ method              # Variable for the measured packet rate
+    # fioState                  Created in the scan method                  # Variable for the last FIO state read
+
+    def __init__(self, labJackDriver, tickRate=100):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the InputScanner object with the LabJack
+        connection and the rate at which the FIO inputs are scanned
+        :param labJackDriver: This is the LabJack connection used to send the
+                              feedback packets
+        :param tickRate: This is the number of scans (packets) per second.
+                         It's value is 100 (every 10 milli sec) by default
+        """
+        if tickRate <= 0:                                                   # If the scan rate is not positive
+            raise ValueError("tickRate must be greater than 0")             # Refuse to build the scanner
+        self.labJackDriver = labJackDriver                                  # Hold a reference to the LabJack
+        self.tickRate = tickRate                                            # Set the number of scans per second
+        self.handlers = []                                                  # Start with no FIO bit handlers
+        self.packetsSent = 0                                                # Start with no packets sent
+        self.packetsPerSecond = 0.0                                         # Start with no measured packet rate
+        self.fioState = None                                                # Start with no FIO state read
+        self._windowStart = time.monotonic()                                # Start the packet rate window
+        self._windowPackets = 0                                             # Start the packet rate window count
+
+    def tickInterval(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the time between two scans
+        :return: The time between two scans in milli seconds (at least 1)
+        """
+        return max(1, int(round(1000 / self.tickRate)))                     # Convert scans/sec -> milli sec
+
+    def addHandler(self, handler):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to register a handler that receives the
+        FIO state byte after every scan
+        :param handler: This is a function that takes the FIO state byte
+        """
+        if handler not in self.handlers:                                    # If the handler is not registered
+            self.handlers.append(handler)                                   # Add it to the handlers list
+
+    def removeHandler(self, handler):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop a handler from receiving the FIO state
+        :param handler: This is a function previously passed to addHandler
+        """
+        if handler in self.handlers:                                        # If the handler is registered
+            self.handlers.remove(handler)                                   # Remove it from the handlers list
+
+    def scan(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read all the FIO inputs with one feedback
+        packet and pass the FIO state byte to every registered handler.
+        The FIO mask is 0 so the read never overwrites the output pins
+        :return: The FIO state byte that was read
+        """
+        inputCheck = self.labJackDriver.feedback(FIOMask=0)                 # Read the FIO pins (no updates)
+        self._countPacket()                                                 # Count the feedback packet
+        self.fioState = inputCheck["FIOState"]                              # Hold the FIO state byte
+        for handler in list(self.handlers):                                 # For every registered handler
+            handler(self.fioState)                                          # Pass it the FIO state byte
+        return self.fioState
+
+    def _countPacket(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to count a sent packet and update the number
+        of packets sent per second once every second
+        """
+        self.packetsSent += 1                                               # Add one to the total packet count
+        self._windowPackets += 1                                            # Add one to the window packet count
+        now = time.monotonic()                                              # Get the current time
+        elapsed = now - self._windowStart                                   # Get the window length so far
+        if elapsed >= 1.0:                                                  # If a second (or more) has passed
+            self.packetsPerSecond = self._windowPackets / elapsed           # Update the packets per second
+            self._windowStart = now                                         # Start a new packet rate window
+            self._windowPackets = 0                                         # Reset the window packet count
+
+    def stop(self, labJackDriver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the scans. A polled scan has nothing
+        running on the UE9, so there is nothing to stop
+        :param labJackDriver: This is the LabJack connection (worker command)
+        """
+# End of Class
+
+
+class StreamScanner(InputScanner):
+    inputBits = 0b11000                                                     # Variable for the input pins (FIO3/4)
+    samplesPerRead = 16                                                     # Variable for the scans per UE9 packet
+    # scanRate                  Passed in the __init__ method               # Variable for the UE9 scans per second
+    # samplesRead               Created in the __init__ method              # Variable for the total scans read
+    # pressEdges                Created in the __init__ method              # Variable for the presses per input bit
+    # blockHandlers             Created in the __init__ method              # Variable for the scan block handlers
+
+    def __init__(self, labJackDriver, scanRate=1000):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the StreamScanner object. The UE9 scans
+        the FIO pins at scanRate and they are read one packet at a time
+        :param labJackDriver: This is the LabJack connection that streams
+        :param scanRate: This is the number of UE9 scans per second
+        """
+        if scanRate <= 0:                                                   # If the scan rate is not positive
+            raise ValueError("scanRate must be greater than 0")             # Refuse to build the scanner
+        super().__init__(labJackDriver, scanRate / self.samplesPerRead)     # One read per UE9 packet
+        self.scanRate = scanRate                                            # Set the UE9 scans per second
+        self.samplesRead = 0                                                # Start with no scans read
+        self.pressEdges = {bit: 0 for bit in (0b01000, 0b10000)}            # Start with no presses
+        self.blockHandlers = []                                             # Start with no scan block handlers
+        self._streamDriver = None                                           # No LabJack is streaming
+        self._lastSample = None                                             # The last scan of the last block
+        self._stopped = False                                               # The scans are not stopped
+
+    def tickInterval(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the time between two stream reads. It
+        is rounded up, so a read is only due once a packet is full and the
+        worker does not wait inside the read (it runs commands meanwhile)
+        :return: The time between two reads in milli seconds (at least 1)
+        """
+        return max(1, int(math.ceil(1000 * self.samplesPerRead / self.scanRate)))
+
+    def addBlockHandler(self, handler):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to register a handler that receives every
+        scan of a read, not only the merged FIO state (e.g. telemetry)
+        :param handler: This is a function that takes the FIO state of every
+                        scan as bytes (oldest first)
+        """
+        if handler not in self.blockHandlers:                               # If the handler is not registered
+            self.blockHandlers.append(handler)                              # Add it to the block handlers list
+
+    def scan(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read the UE9 scans since the last read and
+        pass one FIO state to every registered handler. An input pressed in
+        any scan of the block is passed as pressed (active low). The block
+        handlers get every scan of the block
+        :return: The FIO state passed to the handlers (None before any scan)
+        """
+        if self._stopped:                                                   # If the scans were stopped
+            return self.fioState
+        if self._streamDriver is not self.labJackDriver:                    # If this LabJack is not streaming
+            self.labJackDriver.streamStart(self.scanRate)                   # Start the hardware timed scans
+            self._streamDriver = self.labJackDriver                         # Hold the streaming LabJack
+            return self.fioState                                            # Read once the first packet is full
+        samples = self.labJackDriver.streamRead()                           # Read the scans (one packet)
+        self._countPacket()                                                 # Count the stream read
+        if not samples:                                                     # If no scans arrived
+            return self.fioState
+        self.samplesRead += len(samples)                                    # Count the scans read
+        lowBits = self._findPresses(samples)                                # Count the presses in the block
+        self.fioState = (samples[-1] & ~self.inputBits) | (lowBits & self.inputBits)   # Hold any press
+        for handler in list(self.blockHandlers):                            # For every scan block handler
+            handler(samples)                                                # Pass it every scan of the block
+        for handler in list(self.handlers):                                 # For every registered handler
+            handler(self.fioState)                                          # Pass it the FIO state byte
+        return self.fioState
+
+    def stop(self, labJackDriver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the hardware timed scans on the UE9.
+        It runs on the worker thread (queued with submit)
+        :param labJackDriver: This is the LabJack connection (worker command)
+        """
+        self._stopped = True                                                # Stop reading the scans
+        if self._streamDriver is not None:                                  # If a LabJack is streaming
+            streamDriver, self._streamDriver = self._streamDriver, None
+            streamDriver.streamStop()                                       # Stop the hardware timed scans
+
+    def _findPresses(self, samples):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to count every press (1 -> 0 edge of an input
+        bit) in a block of scans, starting from the last scan of the block
+        before
+        :param samples: This is the FIO state of every scan as bytes
+        :return: The AND of every scan (an input bit is 0 if it was pressed)
+        """
+        previous = samples[0] if self._lastSample is None else self._lastSample # The scan before the block
+        self._lastSample = samples[-1]                                      # Hold it for the next block
+        if numpy is not None:                                               # If NumPy is installed
+            states = numpy.frombuffer(samples, dtype=numpy.uint8)
+            before = numpy.empty_like(states)
+            before[0] = previous                                            # Shift the scans by one
+            before[1:] = states[:-1]
+            falling = before & ~states                                      # Bits that went 1 -> 0
+            for bit in self.pressEdges:                                     # For every input bit
+                self.pressEdges[bit] += int(numpy.count_nonzero(falling & bit))
+            return int(numpy.bitwise_and.reduce(states))
+        lowBits = 0xFF
+        for state in samples:                                               # For every scan
+            falling = previous & ~state                                     # Bits that went 1 -> 0
+            if falling & self.inputBits:                                    # If an input was pressed
+                for bit in self.pressEdges:                                 # For every input bit
+                    if falling & bit:
+                        self.pressEdges[bit] += 1                           # Count the press
+            lowBits &= state
+            previous = state
+        return lowBits
+# End of Class
+
+
+class LabJackWorker:
+    # labJackDriver             Passed in the __init__ method               # Variable for the LabJack connection
+    # inputScanner              Passed in the __init__ method               # Variable for the shared input scan
+    # deliver                   Passed in the __init__ method               # Variable for the GUI thread handoff
+    # commands                  Created in the __init__ method              # Variable for the command queue
+    # inputListeners            Created in the __init__ method              # Variable for the GUI FIO handlers
+    # commandsFailed            Created in the __init__ method              # Variable for the failed command count
+    # coalescers                Created in the __init__ method              # Variable for the latest-value commands
+    # linkUp                    Created in the __init__ method              # Variable for the LabJack link state
+    # linkListeners             Created in the __init__ method              # Variable for the link state handlers
+    # instrumentation           Created in the __init__ method              # Variable for the scan timing (or None)
+    failureLimit = 10                                                       # Variable sets failed scans -> link down
+    inputBits = 0b11000                                                     # Variable for the input pins (FIO3/4)
+
+    def __init__(self, labJackDriver, inputScanner, deliver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the LabJackWorker object that owns the
+        LabJack connection and runs every UE9 packet on its own thread
+        :param labJackDriver: This is the LabJack connection
+        :param inputScanner: This is the InputScanner read every tick. Its
+                             handlers run on the worker thread (safety)
+        :param deliver: This is a function used to run a function on the
+                        GUI thread without waiting for it, e.g. a queue
+                        the Tk GUI polls. It's value is
+                        None if the listeners can run on the worker thread
+        """
+        self.labJackDriver = labJackDriver                                  # Hold a reference to the LabJack
+        self.inputScanner = inputScanner                                    # Hold a reference to the input scan
+        self.inputScanner.labJackDriver = labJackDriver                     # Scan the same LabJack connection
+        self.deliver = deliver                                              # Hold the GUI thread handoff
+        self.commands = queue.Queue()                                       # Create the command queue
+        self.inputListeners = []                                            # Start with no GUI FIO handlers
+        self.commandsFailed = 0                                             # Start with no failed commands
+        self.coalescers = []                                                # Start with no latest-value commands
+        self.linkUp = True                                                  # Start with the link up
+        self.linkListeners = []                                             # Start with no link state handlers
+        self.instrumentation = None                                         # Start with no scan timing
+        self._scanFailures = 0                                              # Start with no failed scans in a row
+        self._timers = []                                                   # Start with no timed commands
+        self._timerCount = itertools.count()                                # Order for timers due together
+        self._timerLock = threading.Lock()                                  # Lock for the timed commands
+        self._thread = None                                                 # The worker thread (not started)
+        self._running = False                                               # The worker loop is not running
+        self._inputLock = threading.Lock()                                  # Lock for the FIO state handoff
+        self._pendingInput = None                                           # The FIO state waiting for the GUI
+        self._deliveryQueued = False                                        # No GUI handoff is waiting
+
+    def start(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start the worker thread
+        """
+        if self._thread is None or not self._thread.is_alive():             # If the worker is not running
+            self._running = True                                            # Set the worker loop to running
+            self._thread = threading.Thread(target=self._run,
+                                            name="LabJackWorker",
+                                            daemon=True)                    # Create the worker thread
+            self._thread.start()                                            # Start the worker thread
+
+    def stop(self, timeout=1.0):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the worker thread once every command
+        already in the queue has been sent. The LabJack connection is closed
+        :param timeout: This is the number of seconds to wait for the thread
+        """
+        if self._thread is not None:                                        # If the worker was started
+            self.commands.put(None)                                         # Queue the stop marker
+            self._thread.join(timeout)                                      # Wait for the queue to drain
+            self._thread = None                                             # Forget the stopped thread
+
+    def isRunning(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if the worker thread is running
+        :return: True if the worker thread is alive
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def setDriver(self, labJackDriver):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hand a new LabJack connection to the worker.
+        The change is queued so it never happens in the middle of a command.
+        The old connection is closed (the UE9 takes only a few)
+        :param labJackDriver: This is the new LabJack connection
+        """
+        def swapDriver(oldDriver):
+            self.labJackDriver = labJackDriver                              # Use the new LabJack connection
+            self.inputScanner.labJackDriver = labJackDriver                 # Scan the new LabJack connection
+            self._scanFailures = 0                                          # Forget the old failed scans
+            if oldDriver is not labJackDriver:                              # If the connection was replaced
+                oldDriver.close()                                           # Close the old LabJack connection
+        self.submit(swapDriver)                                             # Queue the connection change
+
+    def submit(self, command, *args):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to queue a command for the worker thread and
+        return immediately
+        :param command: This is a function called as command(labJackDriver,
+                        *args) on the worker thread
+        :param args: These are the extra values passed to the command
+        """
+        self.commands.put((command, args))                                  # Queue the command and its values
+
+    def addCoalescer(self, coalescer):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to let the worker write the values offered to
+        a CommandCoalescer
+        :param coalescer: This is the CommandCoalescer to serve
+        """
+        if coalescer not in self.coalescers:                                # If the coalescer is not registered
+            self.coalescers.append(coalescer)                               # Add it to the coalescers list
+
+    def offer(self, coalescer, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hand a new value to a CommandCoalescer and
+        wake the worker, then return immediately. A value still waiting to be
+        written is replaced (latest value wins)
+        :param coalescer: This is the CommandCoalescer that writes the value
+        :param value: This is the newest value
+        """
+        self.addCoalescer(coalescer)                                        # Make sure the worker serves it
+        coalescer.offer(value)                                              # Replace the waiting value
+        self.commands.put(_WAKE)                                            # Wake the worker up
+
+    def callLater(self, delay, command, *args):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run a command on the worker thread after a
+        delay, without blocking the worker (scans keep running meanwhile)
+        :param delay: This is the delay in milli seconds
+        :param command: This is a function called as command(labJackDriver,
+                        *args) on the worker thread
+        :param args: These are the extra values passed to the command
+        """
+        dueTime = time.monotonic() + delay / 1000                           # Get the time the command is due
+        with self._timerLock:
+            heapq.heappush(self._timers, (dueTime, next(self._timerCount),
+                                          command, args))                   # Add it to the timed commands
+        self.commands.put(_WAKE)                                            # Wake the worker up
+
+    def addInputListener(self, listener):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to register a handler that receives the latest
+        FIO state byte on the GUI thread
+        :param listener: This is a function that takes the FIO state byte
+        """
+        if listener not in self.inputListeners:                             # If the listener is not registered
+            self.inputListeners.append(listener)                            # Add it to the listeners list
+
+    def _run(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is the worker loop. Every pass takes one queued command
+        (waiting for one only while the next scan is not due) and then scans
+        the inputs if the scan is due, so a busy queue can never delay the
+        E-Brake check by more than one command and a slow link (a round trip
+        longer than the scan interval) still runs every command. Latest-value
+        and timed commands only run once the queue is empty, so they never
+        get ahead of a command queued before them (e.g. the ON packets)
+        """
+        nextScan = time.monotonic()                                         # Scan as soon as the worker starts
+        while self._running:
+            now = time.monotonic()                                          # Get the current time
+            waitTime = nextScan - now                                       # Get the time left until the scan
+            for coalescer in self.coalescers:                               # For every latest-value command
+                dueTime = coalescer.dueIn(now)                              # Get the time left until its write
+                if dueTime is not None:                                     # If it has a value waiting
+                    waitTime = min(waitTime, dueTime)                       # Wake up in time to write it
+            with self._timerLock:
+                if self._timers:                                            # If a timed command is waiting
+                    waitTime = min(waitTime, self._timers[0][0] - now)      # Wake up in time to run it
+            try:
+                if waitTime > 0:                                            # If nothing is due yet
+                    command = self.commands.get(timeout=waitTime)           # Wait for a command (or due work)
+                else:                                                       # If a scan (or other work) is due
+                    command = self.commands.get_nowait()                    # Take a waiting command, if any
+            except queue.Empty:                                             # If no command is waiting
+                command = _WAKE                                             # Go on to the due work
+            if command is None:                                             # If the stop marker was received
+                self._running = False                                       # Set the worker loop to stopped
+                self._execute((lambda labJackDriver: labJackDriver.close(), ()))    # Close the LabJack connection
+                break
+            if command is not _WAKE:                                        # If a command was received
+                self._execute(command)                                      # Send it to the LabJack
+            else:                                                           # If no command is waiting
+                for coalescer in self.coalescers:                           # For every latest-value command
+                    if coalescer.dueIn(time.monotonic()) == 0:              # If its value can be written now
+                        self._execute((coalescer.flush, ()))                # Write the newest value
+                for command in self._dueTimers():                           # For every timed command now due
+                    self._execute(command)                                  # Run it with the LabJack
+            if time.monotonic() >= nextScan:                                # If the scan is due
+                interval = self.inputScanner.tickInterval() / 1000          # Get the scan interval in seconds
+                nextScan = max(nextScan + interval, time.monotonic())       # Set the next scan (never bursts)
+                self._scan()                                                # Scan the FIO inputs
+
+    def _dueTimers(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to take the timed commands that are now due
+        :return: A list of (function, args) pairs in the order they are due
+        """
+        dueCommands = []                                                    # Start with no due commands
+        now = time.monotonic()                                              # Get the current time
+        with self._timerLock:
+            while self._timers and self._timers[0][0] <= now:               # While the next timer is due
+                dueTime, order, command, args = heapq.heappop(self._timers) # Take it off the timers
+                dueCommands.append((command, args))                         # Add it to the due commands
+        return dueCommands
+
+    def _execute(self, command):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run one queued command. A failed command is
+        counted and reported but never stops the worker
+        :param command: This is a (function, args) pair from the queue
+        """
+        function, args = command
+        try:
+            function(self.labJackDriver, *args)                             # Run the command with the LabJack
+        except Exception as error:                                          # If the UE9 packet failed
+            self.commandsFailed += 1                                        # Count the failed command
+            logger.warning("LabJack command failed: %s", error)             # Log -> Failed...
+
+    def _scan(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to scan the FIO inputs and hand the latest FIO
+        state to the GUI thread. Only one handoff is queued at a time, the
+        GUI gets the newest FIO state when it gets to it, with every input
+        pressed since the last handoff still pressed (active low), so a short
+        press is never lost while the GUI is busy
+        """
+        if self.instrumentation is not None:                                # If the scans are timed
+            self.instrumentation.recordScan()                               # Record the time between scans
+        try:
+            fioState = self.inputScanner.scan()                             # Read the FIO pins and call handlers
+        except Exception as error:                                          # If the UE9 packet was lost
+            self.commandsFailed += 1                                        # Count the failed scan
+            self._scanFailures += 1                                         # Count the failed scan in a row
+            if self.linkUp:                                                 # If the link was up
+                logger.warning("LabJack input scan failed: %s", error)      # Log -> Failed...
+                if self._scanFailures >= self.failureLimit:                 # If too many scans failed in a row
+                    self._setLinkUp(False)                                  # Set the link as down
+            return
+        self._scanFailures = 0                                              # Reset the failed scans in a row
+        if not self.linkUp:                                                 # If the link was down
+            self._setLinkUp(True)                                           # Set the link as up again
+        if fioState is None or not self.inputListeners:                     # If nothing was read (or no listeners)
+            return
+        with self._inputLock:
+            if self._pendingInput is not None:                              # If the GUI has not read the last one
+                fioState &= self._pendingInput | ~self.inputBits            # Keep the presses it has not seen
+            self._pendingInput = fioState                                   # Hold the newest FIO state
+            if self._deliveryQueued:                                        # If a GUI handoff is already waiting
+                return                                                      # It will pick up the newest state
+            self._deliveryQueued = True                                     # Set a GUI handoff as waiting
+        if self.deliver is None:                                            # If there is no GUI thread
+            self._deliverInputs()                                           # Call the listeners right here
+        else:                                                               # If there is a GUI thread
+            self.deliver(self._deliverInputs)                               # Call the listeners on the GUI thread
+
+    def _setLinkUp(self, linkUp):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to change the link state and tell every link
+        listener. The listeners run on the worker thread
+        :param linkUp: This is True if the LabJack answers again
+        """
+        self.linkUp = linkUp                                                # Set the link state
+        for listener in list(self.linkListeners):                           # For every link listener
+            listener(linkUp)                                                # Tell it the new link state
+
+    def _deliverInputs(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to pass the newest FIO state to every listener
+        """
+        with self._inputLock:
+            fioState = self._pendingInput                                   # Get the newest FIO state
+            self._pendingInput = None                                       # The next scans start a new handoff
+            self._deliveryQueued = False                                    # Allow the next GUI handoff
+        for listener in list(self.inputListeners):                          # For every registered listener
+            listener(fioState)                                              # Pass it the FIO state byte
+# End of Class
+
+
+class CommandCoalescer:
+    # command                   Passed in the __init__ method               # Variable for the write function
+    # minInterval               Passed in the __init__ method               # Variable for the time between writes
+    # lastValue                 Created in the __init__ method              # Variable for the last value written
+    # updatesSent               Created in the __init__ method              # Variable for the written value count
+    # updatesDropped            Created in the __init__ method              # Variable for the replaced value count
+    # updatesSkipped            Created in the __init__ method              # Variable for the unchanged value count
+
+    def __init__(self, command, minInterval=50):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the CommandCoalescer object. Values are
+        offered as fast as they come but only the newest one is written, no
+        more than once per minimum interval. The worker only writes it once
+        its command queue is empty, so a value never gets ahead of a command
+        queued before it was offered (e.g. the ON packets)
+        :param command: This is a function called as command(labJackDriver,
+                        value) on the worker thread
+        :param minInterval: This is the minimum time between two writes in
+                            milli seconds. It's value is 50 by default
+        """
+        self.command = command                                              # Hold the write function
+        self.minInterval = minInterval                                      # Set the time between writes
+        self.lastValue = None                                               # Start with no value written
+        self.updatesSent = 0                                                # Start with no values written
+        self.updatesDropped = 0                                             # Start with no values replaced
+        self.updatesSkipped = 0                                             # Start with no values unchanged
+        self._lock = threading.Lock()                                       # Lock for the waiting value
+        self._pending = False                                               # No value is waiting
+        self._pendingValue = None                                           # The value waiting to be written
+        self._lastWrite = None                                              # The time of the last write
+
+    def offer(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hand in a new value. A value still waiting
+        to be written is dropped and replaced
+        :param value: This is the newest value
+        """
+        with self._lock:
+            if self._pending:                                               # If a value is still waiting
+                self.updatesDropped += 1                                    # Count the dropped value
+            self._pending = True                                            # Set a value as waiting
+            self._pendingValue = value                                      # Hold the newest value
+
+    def markWritten(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to tell the coalescer that the value was
+        written by some other command (e.g. when the motor is turned on)
+        :param value: This is the value now on the device
+        """
+        with self._lock:
+            self.lastValue = value                                          # Set the last value written
+
+    def dueIn(self, now):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the time left until the waiting value
+        can be written
+        :param now: This is the current time from time.monotonic()
+        :return: The seconds left (0 if it can be written now) or None if no
+                 value is waiting
+        """
+        with self._lock:
+            if not self._pending:                                           # If no value is waiting
+                return None
+            if self._lastWrite is None:                                     # If nothing was written yet
+                return 0
+            return max(0, self._lastWrite + self.minInterval / 1000 - now)  # Get the time left in the interval
+
+    def flush(self, labJackDriver):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the waiting value. A value equal to
+        the last value written is skipped. It runs on the worker thread
+        :param labJackDriver: This is the LabJack connection
+        """
+        with self._lock:
+            if not self._pending:                                           # If no value is waiting
+                return
+            value = self._pendingValue                                      # Get the newest value
+            self._pending = False                                           # Set no value as waiting
+            if value == self.lastValue:                                     # If the device already has it
+                self.updatesSkipped += 1                                    # Count the skipped value
+                return
+            self._lastWrite = time.monotonic()                              # Start the next interval
+        self.command(labJackDriver, value)                                  # Write the value to the LabJack
+        self.lastValue = value                                              # Set the last value written
+        self.updatesSent += 1                                               # Count the written value
+# End of Class
+
+
+class MotorOutputs:
+    timerClockBase = 1                                                      # Variable sets Base Clk (48Mhz)
+    timerClockDivisor = 1                                                   # Variable sets the Clock Divisor
+    timerMode = 0                                                           # Variable sets 16-bit PWM (65,536)
+    counterEnabled = False                                                  # Variable sets Counter0 (encoder) on
+    counterPin = 0b00010                                                    # Variable for the Counter0 pin (FIO1)
+    # fioMask                   Passed in the __init__ method               # Variable for the FIO pin Masks
+    # fioDir                    Passed in the __init__ method               # Variable for the FIO pin Dirs
+    # offState                  Passed in the __init__ method               # Variable for the FIO pins when OFF
+    # fioState                  Created in the __init__ method              # Variable for the FIO pins on the UE9
+    # timerValue                Created in the __init__ method              # Variable for the Timer0Value on the UE9
+    # timerEnabled              Created in the __init__ method              # Variable for the timer on the UE9
+    # configured                Created in the __init__ method              # Variable for the clock set up
+    # packetsSent               Created in the __init__ method              # Variable for the output packet count
+
+    def __init__(self, fioMask=0b11111, fioDir=0b00111, fioState=0b11111):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the MotorOutputs object with the FIO pins
+        it drives and the state the pins start in
+        :param fioMask: This is the mask of the FIO pins that are written
+        :param fioDir: This is the direction of the FIO pins (1 -> output)
+        :param fioState: This is the FIO state the pins start in (all hi,
+                         the Driver is OFF)
+        """
+        self.fioMask = fioMask                                              # Set the FIO pin Masks
+        self.fioDir = fioDir                                                # Set the FIO pin Dirs
+        self.offState = fioState                                            # Set the FIO pin States when OFF
+        self.fioState = fioState                                            # Set the FIO pin States
+        self.timerValue = 0                                                 # Start with the timer value at 0
+        self.timerEnabled = False                                           # Start with the timer off
+        self.configured = False                                             # Start with the clock not set up
+        self.packetsSent = 0                                                # Start with no packets sent
+
+    def configure(self, labJackDriver):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to set up the timer clock and put every output
+        in a known (OFF) state. It is sent once per LabJack connection
+        :param labJackDriver: This is the LabJack connection
+        """
+        self.configured = False                                             # Forget the old connection state
+        labJackDriver.feedback(FIOMask=self.fioMask,                        # Set the UE9 pin Masks (Update)
+                               FIODir=self.fioDir,                          # Set the UE9 pin Dirs (Direction)
+                               FIOState=self.offState)                      # Set the UE9 pin States (HI or LOW)
+        self.fioState = self.offState                                       # Hold the FIO state on the UE9
+        self._sendConfig(labJackDriver, False, 0)                           # Set up the clock with the timer off
+        self.packetsSent += 1                                               # Count the feedback packet
+        self.configured = True                                              # Set the clock as set up
+
+    def apply(self, labJackDriver, fioState=None, timerValue=None, timerEnabled=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a state change as one transaction. Only
+        the parts that differ from the UE9 are sent:
+            - Timer turned on/off   -> one timer packet with UpdateConfig
+            - Timer value changed   -> one Timer0 value update (UpdateReset bit 0)
+            - FIO pins changed      -> one feedback packet
+        When turning off, the FIO pins go first so the H-Bridge stops before
+        the timer does. When turning on, the timer goes first
+        :param labJackDriver: This is the LabJack connection
+        :param fioState: This is the new FIO state. None keeps the pins
+        :param timerValue: This is the new Timer0Value. None keeps the value
+        :param timerEnabled: This is True/False to turn the timer on/off.
+                             None keeps the timer as it is
+        """
+        if not self.configured:                                             # If the clock is not set up yet
+            self.configure(labJackDriver)                                   # Set it up (once per connection)
+        if timerValue is None:                                              # If no new timer value was given
+            timerValue = self.timerValue                                    # Keep the value on the UE9
+        if timerEnabled is None:                                            # If no timer change was given
+            timerEnabled = self.timerEnabled                                # Keep the timer as it is
+        if fioState is not None and not timerEnabled:                       # If turning off (or staying off)
+            self._sendFIO(labJackDriver, fioState)                          # Stop the H-Bridge first
+        if timerEnabled != self.timerEnabled:                               # If the timer is turned on/off
+            self._sendConfig(labJackDriver, timerEnabled, timerValue)       # Send the timer config packet
+        elif timerEnabled and timerValue != self.timerValue:                # If only the duty cycle changed
+            labJackDriver.setTimer0Value(timerValue)                        # Set only the Timer Value
+            self.packetsSent += 1                                           # Count the timer packet
+        self.timerValue = timerValue                                        # Hold the Timer0Value on the UE9
+        if fioState is not None and timerEnabled:                           # If turning on (or staying on)
+            self._sendFIO(labJackDriver, fioState)                          # Drive the H-Bridge last
+
+    def _sendConfig(self, labJackDriver, timerEnabled, timerValue):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a full timer config packet. The UE9
+        puts Counter0 on the pin after the enabled timers, so it is only
+        enabled with the PWM timer on (FIO1). With no timer it would take
+        FIO0 and stop driving the Enable pin
+        :param labJackDriver: This is the LabJack connection
+        :param timerEnabled: This is True to turn the PWM timer on
+        :param timerValue: This is the Timer0Value to start with
+        """
+        labJackDriver.timerCounter(TimerClockBase=self.timerClockBase,      # Set Base Clk to System Clk (48Mhz)
+                                   TimerClockDivisor=self.timerClockDivisor,    # Set Clock Divisor to 1
+                                   Timer0Mode=self.timerMode,               # Set Timer Mode to 16-bit (65,536)
+                                   NumTimersEnabled=int(timerEnabled),      # Set the number of enabled timers
+                                   Counter0Enabled=self.counterEnabled and timerEnabled,    # Counter0 -> FIO1
+                                   UpdateConfig=1,                          # Set Update Timer parameter to True
+                                   Timer0Value=timerValue)                  # Set the Timer Value
+        self.packetsSent += 1                                               # Count the timer packet
+        self.timerEnabled = timerEnabled                                    # Hold the timer state on the UE9
+        self.timerValue = timerValue                                        # Hold the Timer0Value on the UE9
+
+    def _sendFIO(self, labJackDriver, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send the FIO pins if they changed
+        :param labJackDriver: This is the LabJack connection
+        :param fioState: This is the new FIO state
+        """
+        if fioState == self.fioState:                                       # If the pins are already set
+            return                                                          # Skip the feedback packet
+        labJackDriver.feedback(FIOMask=self.fioMask,                        # Set the UE9 pin Masks (Update)
+                               FIODir=self.fioDir,                          # Set the UE9 pin Dirs (Direction)
+                               FIOState=fioState)                           # Set the UE9 pin States (HI or LOW)
+        self.packetsSent += 1                                               # Count the feedback packet
+        self.fioState = fioState                                            # Hold the FIO state on the UE9
+# End of Class
+
+
+class DirectionSequencer:
+    # labJackWorker             Passed in the __init__ method               # Variable for the UE9 I/O thread
+    # motorOutputs              Passed in the __init__ method               # Variable for the UE9 output state
+    # deadTime                  Passed in the __init__ method               # Variable for the H-Bridge dead time
+    # coastState                Passed in the __init__ method               # Variable for the all-off FIO state
+    # state                     Created in the __init__ method              # Variable for the sequence step
+    # targetState               Created in the start method                 # Variable for the new direction pins
+    # transitionsCompleted      Created in the __init__ method              # Variable for the finished changes
+    # transitionsAborted        Created in the __init__ method              # Variable for the aborted changes
+    IDLE = "IDLE"                                                           # Step -> driving (or off)
+    DEAD_TIME = "DEAD_TIME"                                                 # Step -> coasting, waiting to drive
+
+    def __init__(self, labJackWorker, motorOutputs, deadTime=100, coastState=0b11111):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the DirectionSequencer object that changes
+        the H-Bridge direction as coast -> dead time -> drive
+        :param labJackWorker: This is the LabJackWorker that runs the timers
+        :param motorOutputs: This is the MotorOutputs that sends the pins
+        :param deadTime: This is the time the H-Bridge coasts before driving
+                         the new direction in milli seconds
+        :param coastState: This is the FIO state with the En, Frd, Brd pins
+                           hi (H-Bridge off)
+        """
+        self.labJackWorker = labJackWorker                                  # Hold a reference to the I/O thread
+        self.motorOutputs = motorOutputs                                    # Hold a reference to the outputs
+        self.deadTime = deadTime                                            # Set the H-Bridge dead time
+        self.coastState = coastState                                        # Set the all-off FIO state
+        self.state = self.IDLE                                              # Start with no change running
+        self.targetState = None                                             # Start with no new direction
+        self.transitionsCompleted = 0                                       # Start with no finished changes
+        self.transitionsAborted = 0                                         # Start with no aborted changes
+        self._sequence = 0                                                  # Number of the running change
+
+    def start(self, labJackDriver, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start a direction change. The H-Bridge is
+        turned off now and the new direction is driven after the dead time.
+        A change asked for during the dead time just updates the direction
+        that is driven at its end. It runs on the worker thread
+        :param labJackDriver: This is the LabJack connection
+        :param fioState: This is the FIO state for the new direction
+        """
+        self.targetState = fioState                                         # Hold the new direction pins
+        if self.state == self.DEAD_TIME:                                    # If the H-Bridge is already coasting
+            return                                                          # Drive the new one when it ends
+        self.motorOutputs.apply(labJackDriver, fioState=self.coastState)    # Turn the En, Frd, Brd pins to hi
+        self.state = self.DEAD_TIME                                         # Set the step to dead time
+        self._sequence += 1                                                 # Start a new change
+        self.labJackWorker.callLater(self.deadTime, self._drive,
+                                     self._sequence)                        # Drive when the dead time is over
+
+    def abort(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop a running direction change at once
+        (e.g. E-Brake). The new direction is never driven
+        """
+        if self.state == self.DEAD_TIME:                                    # If a change is running
+            self.transitionsAborted += 1                                    # Count the aborted change
+        self.state = self.IDLE                                              # Set the step to idle
+        self._sequence += 1                                                 # Forget the waiting drive step
+
+    def _drive(self, labJackDriver, sequence):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to drive the new direction at the end of the
+        dead time. It does nothing if the change was aborted
+        :param labJackDriver: This is the LabJack connection
+        :param sequence: This is the number of the change that scheduled it
+        """
+        if sequence != self._sequence or self.state != self.DEAD_TIME:      # If the change was aborted
+            return                                                          # Keep the H-Bridge off
+        self.state = self.IDLE                                              # Set the step to idle
+        self.motorOutputs.apply(labJackDriver, fioState=self.targetState)   # Drive the new direction
+        self.transitionsCompleted += 1                                      # Count the finished change
+# End of Class
@@ -0,0 +1,580 @@
+"""
+Description : This is the source code for the hardware layer of the Motor Driver. Everything
+              above it only calls connect, feedback, timerCounter and setTimer0Value, so the same
+              code can drive the real LabJack UE9 or an in-process simulated UE9 with no hardware.
+
+              Backend               |   Used For
+              --------------------------------------
+              UE9Backend            |   The LabJack UE9 over Ethernet (LabJackPython)
+              SimulatedUE9Backend   |   Headless runs and timing (latency, jitter, loss)
+
+              The simulated UE9 reads the E-Brake (FIO3) and Reset (FIO4) inputs from a script,
+              they are active low (0 -> pressed) just like the real circuit.
+
+              Before opening a UE9 connection, probeConnection checks that something answers on
+              the UE9 command port (TCP 52360) with a short timeout, instead of pinging it.
+
+              A backend can also stream the FIO lines: streamStart has the UE9 scan them on its
+              own clock (channel 193, FIO in the low byte) and streamRead returns every scan
+              since the last read as bytes, one FIO state per scan.
+"""
+
+import math                                                                 # Library for the motor model
+import random                                                               # Library for the jitter and loss
+import socket                                                               # Library for the connection probe
+import struct                                                               # Library for the timer packet
+import threading                                                            # Library for the simulator lock
+import time                                                                 # Library for the packet latency
+try:
+    import ue9                                                              # Library to send/receive data
+except ImportError:                                                         # If LabJackPython is not installed
+    ue9 = None                                                              # Only the simulator can be used
+try:
+    import numpy                                                            # Library for the stream decoding
+except ImportError:                                                         # If NumPy is not installed
+    numpy = None                                                            # Decode the packets in Python
+
+UE9_COMMAND_PORT = 52360                                                    # UE9 TCP port for commands
+UE9_FIO_EIO_CHANNEL = 193                                                   # UE9 stream channel of the FIO/EIO
+STREAM_PACKET_SIZE = 46                                                     # Bytes in a UE9 stream data packet
+STREAM_HEADER_SIZE = 12                                                     # Bytes before the samples
+STREAM_SAMPLES_PER_PACKET = 16                                              # Samples in a UE9 stream packet
+TIMER_COUNTER_COMMAND = [0xF8, 0x0C, 0x18]                                  # UE9 TimerCounter command bytes
+TIMER_COUNTER_REPLY = [0xF8, 0x11, 0x18]                                    # UE9 TimerCounter reply bytes
+TIMER_COUNTER_REPLY_SIZE = 40                                               # Bytes in a TimerCounter reply
+
+
+class PacketLostError(Exception):
+    """
+    This exception is raised when a packet to the (simulated) UE9 is lost
+    """
+# End of Class
+
+
+def decodeStreamPackets(data):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to decode a block of raw UE9 stream packets of
+    the FIO/EIO channel in one go
+    :param data: This is the raw stream data (a whole number of packets)
+    :return: The FIO state of every scan as bytes
+    """
+    packetCount = len(data) // STREAM_PACKET_SIZE
+    end = STREAM_HEADER_SIZE + 2 * STREAM_SAMPLES_PER_PACKET
+    if numpy is not None:                                                   # If NumPy is installed
+        packets = numpy.frombuffer(data, dtype=numpy.uint8,
+                                   count=packetCount * STREAM_PACKET_SIZE)
+        samples = packets.reshape(packetCount, STREAM_PACKET_SIZE)[:, STREAM_HEADER_SIZE:end]
+        return samples[:, 0::2].tobytes()                                   # Low byte of every sample -> FIO
+    fioStates = bytearray()
+    for start in range(0, packetCount * STREAM_PACKET_SIZE, STREAM_PACKET_SIZE):    # For every packet
+        fioStates += data[start + STREAM_HEADER_SIZE:start + end:2]         # Low byte of every sample -> FIO
+    return bytes(fioStates)
+
+
+def probeConnection(ipAddress, timeout=0.25, port=UE9_COMMAND_PORT):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to check if a UE9 answers at the IP Address by
+    opening (and closing) a TCP connection to its command port
+    :param ipAddress: This is the IP Address of the UE9
+    :param timeout: This is the longest wait for an answer in seconds
+    :param port: This is the TCP port to try (the UE9 command port)
+    :return: True if the connection was accepted
+    """
+    try:
+        probe = socket.create_connection((ipAddress, port), timeout)        # Try to open the TCP connection
+    except (OSError, ValueError):                                           # If nothing answered in time
+        return False
+    probe.close()                                                           # Close the probe connection
+    return True
+
+
+class MotorDriverBackend:
+    # ipAddress                 Created in the connect method               # Variable for the UE9 IP Address
+
+    def connect(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to open the connection to the UE9
+        :param ipAddress: This is the IP Address of the UE9
+        """
+        raise NotImplementedError
+
+    def feedback(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a feedback packet (FIO pins)
+        :param kwargs: These are the LabJackPython feedback values
+                       (FIOMask, FIODir, FIOState, ...)
+        :return: A dictionary with at least the "FIOState" read
+        """
+        raise NotImplementedError
+
+    def timerCounter(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a timer/counter packet
+        :param kwargs: These are the LabJackPython timerCounter values
+                       (UpdateConfig, NumTimersEnabled, Timer0Value, ...)
+        :return: A dictionary with the timer and counter values
+        """
+        raise NotImplementedError
+
+    def setTimer0Value(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a timer/counter packet that only writes
+        the Timer0 value (the clock and timer config are left as they are)
+        :param value: This is the new Timer0 value
+        :return: A dictionary with the timer and counter values
+        """
+        raise NotImplementedError
+
+    def streamStart(self, scanRate):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start hardware timed scans of the FIO pins
+        :param scanRate: This is the number of scans per second
+        """
+        raise NotImplementedError
+
+    def streamRead(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read the scans since the last read. It
+        waits for at least one stream packet
+        :return: The FIO state of every scan as bytes (oldest first)
+        """
+        raise NotImplementedError
+
+    def streamStop(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the hardware timed scans
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to close the connection to the UE9
+        """
+# End of Class
+
+
+class UE9Backend(MotorDriverBackend):
+    probeTimeout = 0.25                                                     # Variable sets the probe wait (sec)
+    # device                    Created in the connect method               # Variable for the LabJackPython UE9
+    # samplesMissed             Created in the __init__ method              # Variable for the scans the UE9 lost
+
+    def __init__(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the UE9Backend object (not connected)
+        """
+        self.device = None                                                  # Start with no UE9 connection
+        self.ipAddress = None                                               # Start with no IP Address
+        self.samplesMissed = 0                                              # Start with no lost scans
+        self._stream = None                                                 # No stream is running
+
+    def connect(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to open the Ethernet connection to the UE9
+        :param ipAddress: This is the IP Address of the UE9
+        """
+        if ue9 is None:                                                     # If LabJackPython is not installed
+            raise ImportError("LabJackPython (ue9) is required for the UE9 backend")
+        if not probeConnection(ipAddress, self.probeTimeout):               # If the UE9 port does not answer
+            raise ConnectionError("No reply from " + ipAddress)
+        self.device = ue9.UE9(ipAddress=ipAddress, ethernet=True)           # Try to establish LabJack connection
+        self.ipAddress = ipAddress                                          # Hold the IP Address
+
+    def feedback(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a feedback packet to the UE9
+        :param kwargs: These are the LabJackPython feedback values
+        :return: The LabJackPython feedback dictionary
+        """
+        return self.device.feedback(**kwargs)
+
+    def timerCounter(self, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a timer/counter packet to the UE9
+        :param kwargs: These are the LabJackPython timerCounter values
+        :return: The LabJackPython timerCounter dictionary
+        """
+        return self.device.timerCounter(**kwargs)
+
+    def setTimer0Value(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write only the Timer0 value. LabJackPython's
+        timerCounter packs the timer values only with UpdateConfig, so the
+        TimerCounter packet is built here: UpdateConfig off, UpdateReset bit 0
+        (update Timer0) on and the value in bytes 11/12
+        :param value: This is the new Timer0 value (0 -> 65535)
+        :return: A dictionary with the "Timer0" and "Counter0" values
+        """
+        command = [0] * 30
+        command[1:4] = TIMER_COUNTER_COMMAND                                # Set the TimerCounter command
+        command[8] = 0b00000001                                             # Set UpdateReset to update Timer0
+        command[11] = value & 0xFF                                          # Set the Timer0 value (LSB)
+        command[12] = (value >> 8) & 0xFF                                   # Set the Timer0 value (MSB)
+        result = self.device._writeRead(command, TIMER_COUNTER_REPLY_SIZE,
+                                        TIMER_COUNTER_REPLY)                # Send it with the checksums
+        timer0, = struct.unpack("<I", bytes(result[7:11]))                  # Read back the Timer0 value
+        counter0, = struct.unpack("<I", bytes(result[31:35]))               # Read back the Counter0 count
+        return {"Timer0": timer0, "Counter0": counter0}
+
+    def streamStart(self, scanRate):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to have the UE9 scan the FIO/EIO channel on its
+        own clock
+        :param scanRate: This is the number of scans per second
+        """
+        self.device.streamConfig(NumChannels=1, ChannelNumbers=[UE9_FIO_EIO_CHANNEL],
+                                 ChannelOptions=[0], SettlingTime=0, Resolution=12,
+                                 ScanFrequency=scanRate)                    # Scan only the FIO/EIO channel
+        self.device.streamStart()                                           # Start the hardware timed scans
+        self._stream = self.device.streamData(convert=False)                # Read the raw stream packets
+
+    def streamRead(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read the next stream packets of the UE9
+        :return: The FIO state of every scan as bytes (oldest first)
+        """
+        packets = next(self._stream)                                        # Wait for the next stream packets
+        if packets is None:                                                 # If no packet arrived in time
+            return b""
+        self.samplesMissed += packets["missed"]                             # Count the scans the UE9 lost
+        return decodeStreamPackets(packets["result"])                       # Decode the packets in one go
+
+    def streamStop(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the hardware timed scans
+        """
+        if self._stream is not None:                                        # If a stream is running
+            self._stream = None                                             # Forget the stream packets
+            self.device.streamStop()                                        # Stop the hardware timed scans
+
+    def close(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to close the connection to the UE9
+        """
+        if self.device is not None:                                         # If the UE9 is connected
+            self.device.close()                                             # Close the LabJack connection
+            self.device = None                                              # Forget the closed connection
+# End of Class
+
+
+class SimulatedUE9Backend(MotorDriverBackend):
+    inputBits = 0b11000                                                     # Variable for the input pins (FIO3/4)
+    maxRpm = 3000                                                           # Variable sets the RPM at 100 % duty
+    motorTimeConstant = 0.1                                                 # Variable sets the motor lag (sec)
+    encoderPulsesPerRev = 16                                                # Variable sets the Counter0 pulses/rev
+    # load                      Created in the __init__ method              # Variable for the speed lost to load
+    # rpm                       Created in the __init__ method              # Variable for the simulated speed
+    # latency                   Passed in the __init__ method               # Variable for the round trip time
+    # jitter                    Passed in the __init__ method               # Variable for the round trip spread
+    # packetLoss                Passed in the __init__ method               # Variable for the lost packet ratio
+    # fioDir                    Created in the __init__ method              # Variable for the FIO pin Dirs
+    # fioOutputs                Created in the __init__ method              # Variable for the FIO output States
+    # timerEnabled              Created in the __init__ method              # Variable for the PWM timer state
+    # timerValue                Created in the __init__ method              # Variable for the Timer0Value
+    # counter0                  Created in the __init__ method              # Variable for the Counter0 count
+    # packetsReceived           Created in the __init__ method              # Variable for the packets answered
+    # packetsLost               Created in the __init__ method              # Variable for the packets dropped
+    # outputLog                 Created in the __init__ method              # Variable for the output changes
+    # linkUp                    Created in the __init__ method              # Variable for the simulated link
+    # streamScanRate            Created in the streamStart method           # Variable for the stream scans/sec
+
+    def __init__(self, latency=1.0, jitter=0.0, packetLoss=0.0, seed=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the SimulatedUE9Backend object
+        :param latency: This is the packet round trip time in milli seconds
+        :param jitter: This is the +/- spread of the round trip time in
+                       milli seconds
+        :param packetLoss: This is the ratio (0 -> 1) of packets that are lost
+        :param seed: This is the random seed, for runs that can be repeated
+        """
+        self.latency = latency                                              # Set the round trip time
+        self.jitter = jitter                                                # Set the round trip spread
+        self.packetLoss = packetLoss                                        # Set the lost packet ratio
+        self.ipAddress = None                                               # Start with no IP Address
+        self.fioDir = 0                                                     # Start with every pin an input
+        self.fioOutputs = 0b11111                                           # Start with every output hi
+        self.timerEnabled = False                                           # Start with the timer off
+        self.timerValue = 0                                                 # Start with the timer value at 0
+        self.counter0 = 0                                                   # Start with no counted pulses
+        self.load = 0.0                                                     # Start with no load (0 -> 1)
+        self.rpm = 0.0                                                      # Start with the motor stopped
+        self._pulses = 0.0                                                  # The encoder pulses (fractional)
+        self._motorTime = time.monotonic()                                  # The time of the last motor update
+        self.packetsReceived = 0                                            # Start with no packets answered
+        self.packetsLost = 0                                                # Start with no packets dropped
+        self.outputLog = []                                                 # Start with no output changes
+        self.linkUp = True                                                  # Start with the link up
+        self._random = random.Random(seed)                                  # Random numbers for jitter and loss
+        self._lock = threading.Lock()                                       # Lock for the simulated UE9 state
+        self._inputs = self.inputBits                                       # Inputs not pressed (pulled hi)
+        self._script = []                                                   # Start with no scripted inputs
+        self._scriptStart = time.monotonic()                                # The time the script starts
+        self.streamScanRate = None                                          # No stream is running
+        self._streamStart = None                                            # The time the stream started
+        self._streamScans = 0                                               # The stream scans read so far
+
+    def connect(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to "connect" to the simulated UE9. It costs one
+        round trip, like the real one
+        :param ipAddress: This is the IP Address (only kept for display)
+        """
+        if not self.linkUp:                                                 # If the simulated link is down
+            raise ConnectionError("No reply from " + str(ipAddress))
+        self._roundTrip()                                                   # Wait for the simulated packet
+        self.ipAddress = ipAddress                                          # Hold the IP Address
+
+    def setInputs(self, brakePressed=False, resetPressed=False):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to set the E-Brake and Reset inputs now
+        :param brakePressed: This is True to press the E-Brake (FIO3 low)
+        :param resetPressed: This is True to press the Reset (FIO4 low)
+        """
+        with self._lock:
+            self._script = []                                               # Forget any scripted inputs
+            self._inputs = self._inputLevels(brakePressed, resetPressed)    # Set the input pins
+
+    def scriptInputs(self, events):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to script the E-Brake and Reset inputs over time
+        :param events: This is a list of (delay, brakePressed, resetPressed)
+                       with the delay in milli seconds from now. The inputs
+                       keep the values of the last event that is due
+        """
+        with self._lock:
+            self._inputs = self._currentInputs()                            # Keep the inputs until the first event
+            self._script = sorted(events, key=lambda event: event[0])       # Hold the events in time order
+            self._scriptStart = time.monotonic()                            # Start the script now
+
+    def feedback(self, FIOMask=0, FIODir=0, FIOState=0, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to answer a feedback packet. Masked pins take
+        the new direction and state, then every FIO pin is read back
+        :param FIOMask: This is the mask of the pins to update
+        :param FIODir: This is the direction of the pins (1 -> output)
+        :param FIOState: This is the state of the output pins
+        :return: A dictionary with the "FIOState" read
+        """
+        self._roundTrip()                                                   # Wait for the simulated packet
+        with self._lock:
+            self._updateMotor()                                             # Run the motor up to now
+            if FIOMask:                                                     # If some pins are updated
+                self.fioDir = (self.fioDir & ~FIOMask) | (FIODir & FIOMask)         # Set the new pin Dirs
+                self.fioOutputs = (self.fioOutputs & ~FIOMask) | (FIOState & FIOMask)   # Set the pin States
+                self._logOutputs()                                          # Record the output change
+            inputs = self._currentInputs()                                  # Get the input pins now
+            fioState = (self.fioOutputs & self.fioDir) | (inputs & ~self.fioDir)    # Outputs + Inputs
+            return {"FIOState": fioState & 0xFF, "Counter0": self.counter0}
+
+    def timerCounter(self, UpdateConfig=0, NumTimersEnabled=0, Timer0Value=None, **kwargs):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to answer a timer/counter packet the way
+        LabJackPython's timerCounter sends it: the number of timers and the
+        Timer0 value are only written with UpdateConfig, without it the
+        packet only reads the timers back (use setTimer0Value)
+        :param UpdateConfig: This is 1 to update the timer configuration
+        :param NumTimersEnabled: This is the number of enabled timers
+        :param Timer0Value: This is the new Timer0 value (None keeps it)
+        :return: A dictionary with the "Timer0" and "Counter0" values
+        """
+        self._roundTrip()                                                   # Wait for the simulated packet
+        with self._lock:
+            self._updateMotor()                                             # Run the motor up to now
+            if UpdateConfig:                                                # If the configuration is updated
+                self.timerEnabled = NumTimersEnabled > 0                    # Set the PWM timer on/off
+                if Timer0Value is not None:                                 # If a timer value was sent
+                    self.timerValue = int(Timer0Value)                      # Set the Timer0 value
+            self._logOutputs()                                              # Record the output change
+            return {"Timer0": self.timerValue, "Counter0": self.counter0}
+
+    def setTimer0Value(self, value):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to answer a Timer0 value packet (UpdateReset
+        bit 0), the timer config is left as it is
+        :param value: This is the new Timer0 value
+        :return: A dictionary with the "Timer0" and "Counter0" values
+        """
+        self._roundTrip()                                                   # Wait for the simulated packet
+        with self._lock:
+            self._updateMotor()                                             # Run the motor up to now
+            self.timerValue = int(value)                                    # Set the Timer0 value
+            self._logOutputs()                                              # Record the output change
+            return {"Timer0": self.timerValue, "Counter0": self.counter0}
+
+    def streamStart(self, scanRate):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start the simulated hardware timed scans.
+        Every scan gets the inputs at its own time, so a short scripted
+        E-Brake pulse shows up even if no packet is sent during it
+        :param scanRate: This is the number of scans per second
+        """
+        self._roundTrip()                                                   # Wait for the simulated packet
+        with self._lock:
+            self.streamScanRate = scanRate                                  # Set the stream scans/sec
+            self._streamStart = time.monotonic()                            # Start the scan clock now
+            self._streamScans = 0                                           # Start with no scans read
+
+    def streamRead(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read the simulated scans since the last
+        read, in whole stream packets (waits for at least one packet)
+        :return: The FIO state of every scan as bytes (oldest first)
+        """
+        if self._streamStart is None:                                       # If no stream is running
+            raise RuntimeError("Simulated UE9 stream is not started")
+        packetTime = STREAM_SAMPLES_PER_PACKET / self.streamScanRate        # Time to fill one stream packet
+        nextPacket = self._streamStart + (self._streamScans + STREAM_SAMPLES_PER_PACKET) / self.streamScanRate
+        wait = nextPacket - time.monotonic()
+        if wait > 0:                                                        # If the next packet is not full yet
+            time.sleep(wait)                                                # Wait for it
+        if not self.linkUp:                                                 # If the simulated link is down
+            time.sleep(packetTime)                                          # Nothing arrives for a packet time
+            with self._lock:
+                self.packetsLost += 1                                       # Count the lost packet
+            raise PacketLostError("Simulated UE9 stream packet lost")
+        with self._lock:
+            scans = int((time.monotonic() - self._streamStart) * self.streamScanRate)
+            scans -= (scans - self._streamScans) % STREAM_SAMPLES_PER_PACKET    # Whole packets only
+            outputs = self.fioOutputs & self.fioDir                         # The output pins read back
+            fioStates = bytearray()
+            for scan in range(self._streamScans, scans):                    # For every scan in the packets
+                scanTime = self._streamStart + scan / self.streamScanRate
+                inputs = self._inputsAt((scanTime - self._scriptStart) * 1000)
+                fioStates.append((outputs | (inputs & ~self.fioDir)) & 0xFF)    # Outputs + Inputs
+            self.packetsReceived += (scans - self._streamScans) // STREAM_SAMPLES_PER_PACKET
+            self._streamScans = scans                                       # Move past the scans read
+        return bytes(fioStates)
+
+    def streamStop(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the simulated hardware timed scans
+        """
+        with self._lock:
+            self._streamStart = None                                        # Stop the scan clock
+            self.streamScanRate = None
+
+    def motorDriven(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if the simulated H-Bridge is driving
+        the motor (PWM timer on and a direction pin low)
+        :return: True if the motor is driven
+        """
+        with self._lock:
+            return self._motorDriven()
+
+    def _motorDriven(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if the motor is driven (lock held)
+        :return: True if the PWM timer is on and Frd or Brd is low
+        """
+        return self.timerEnabled and (self.fioOutputs & 0b00110) != 0b00110
+
+    def _updateMotor(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run the simulated motor up to now (lock
+        held). The speed follows the duty cycle (less the load) with a first
+        order lag and the encoder pulses are added to Counter0
+        """
+        now = time.monotonic()
+        elapsed = now - self._motorTime                                     # Get the time since the last update
+        self._motorTime = now
+        dutyCycle = self.timerValue / 65535 if self._motorDriven() else 0.0
+        target = self.maxRpm * dutyCycle * (1 - self.load)                  # Get the speed the motor heads to
+        self.rpm += (target - self.rpm) * (1 - math.exp(-elapsed / self.motorTimeConstant))
+        self._pulses += self.rpm / 60 * self.encoderPulsesPerRev * elapsed  # Add the encoder pulses
+        self.counter0 = int(self._pulses) & 0xFFFFFFFF                      # Counter0 is a 32-bit counter
+
+    def _logOutputs(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to record the outputs if they changed, as
+        (time, FIO outputs, timer on, Timer0 value, motor driven)
+        """
+        entry = (self.fioOutputs, self.timerEnabled, self.timerValue, self._motorDriven())
+        if not self.outputLog or self.outputLog[-1][1:] != entry:           # If the outputs changed
+            self.outputLog.append((time.monotonic(),) + entry)              # Record the output change
+
+    def _inputLevels(self, brakePressed, resetPressed):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the input pin levels (active low)
+        :param brakePressed: This is True if the E-Brake is pressed
+        :param resetPressed: This is True if the Reset is pressed
+        :return: The FIO bits of the input pins
+        """
+        return (0 if brakePressed else 0b01000) | (0 if resetPressed else 0b10000)
+
+    def _currentInputs(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the input pins now, from the script if
+        there is one (lock held)
+        :return: The FIO bits of the input pins
+        """
+        return self._inputsAt((time.monotonic() - self._scriptStart) * 1000)
+
+    def _inputsAt(self, elapsed):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the input pins at a time into the
+        script (lock held). The script is kept, so the inputs of an earlier
+        time can still be read (stream scans)
+        :param elapsed: This is the time into the script in milli seconds
+        :return: The FIO bits of the input pins
+        """
+        inputs = self._inputs                                               # Start with the inputs before it
+        for delay, brakePressed, resetPressed in self._script:              # For every scripted event
+            if delay > elapsed:                                             # If the event is not due yet
+                break
+            inputs = self._inputLevels(brakePressed, resetPressed)          # Take the inputs of the event
+        return inputs
+
+    def _roundTrip(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to wait the simulated round trip time and
+        drop the packet now and then
+        """
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            lost = not self.linkUp or self._random.random() < self.packetLoss   # Check if the packet is lost
+        if delay > 0:                                                       # If the round trip takes time
+            time.sleep(delay / 1000)                                        # Wait for the simulated packet
+        if lost:                                                            # If the packet was lost
+            with self._lock:
+                self.packetsLost += 1                                       # Count the lost packet
+            raise PacketLostError("Simulated UE9 packet lost")
+        with self._lock:
+            self.packetsReceived += 1                                       # Count the answered packet
+# End of Class
@@ -0,0 +1,876 @@
+"""
+Description : This is the source code for the control core of the Motor Driver. The MotorController
+              turns the motor driver circuit on/off, sets the direction and the duty cycle and
+              handles the Emergency Brake and Reset inputs without any GUI. The Tk GUI in
+              motor_driver_gui.py wraps it, and it can also be run from the command line:
+
+              python motor_controller.py 192.168.1.209                 (commands from stdin)
+              python motor_controller.py --simulate -c on -c forward -c "duty 80" -c "wait 2000"
+
+              COMMAND           |   Used For
+              --------------------------------------
+              on / off          |   Turn the motor driver circuit ON / OFF
+              forward / backward|   Set the direction of the motor
+              duty <30-100>     |   Set the duty cycle (speed) of the motor
+              rpm <setpoint>    |   Hold a speed with the encoder (closed loop)
+              reset <password>  |   Confirm a Reset after the Emergency Brake
+              status            |   Print the state of the motor driver
+              stats             |   Print the packet / scan / E-Brake timing numbers
+              metrics <path>    |   Write the timing numbers as a Prometheus text file
+              wait <ms>         |   Wait before the next command
+              quit              |   Turn the motor driver circuit OFF and exit
+"""
+
+import argparse                                                             # Library for the command line
+import math                                                                 # Library for the number check
+import sys                                                                  # Library for the command input
+import threading                                                            # Library for the connect thread
+import time                                                                 # Library for the wait command
+from instrumentation import (Instrumentation, InstrumentedBackend,
+                             configureLogging, logger)                      # Library for the timing and the log
+from labjack_io import (CommandCoalescer, DirectionSequencer, InputScanner,
+                        LabJackWorker, MotorOutputs, StreamScanner)         # Library for the UE9 I/O thread
+from motor_backend import SimulatedUE9Backend, UE9Backend                   # Library for LabJack communication
+from ramp_profiles import RampProfile, RampScheduler                        # Library for the speed ramps
+from speed_control import ClosedLoopSpeed, PIController, dutyToTimerValue   # Library for the closed loop speed
+from telemetry import TelemetryRecorder                                     # Library for the telemetry log
+
+
+class MotorController:
+    FORWARD = 0                                                             # Direction -> Forwards
+    BACKWARD = 1                                                            # Direction -> Backwards
+    NO_DIRECTION = 2                                                        # Direction -> None
+    directionStates = {FORWARD: 0b11100,                                    # FIO state -> En, Frd pins low
+                       BACKWARD: 0b11010}                                   # FIO state -> En, Brd pins low
+    resetPassword = "go"                                                    # Variable for the Reset password
+    resetPressed = False                                                    # Variable used to check Reset press
+    eBrakePressed = False                                                   # Variable used to check Brake press
+    motorRunning = False                                                    # Variable used to check operation
+    driverOn = False                                                        # Variable used to check the UE9 pins
+    previousTimerValue = int(60 * 655.35)                                   # Variable used to track PWM value
+    previousDirection = NO_DIRECTION                                        # Variable used to track direction
+    currentDirection = NO_DIRECTION                                         # Variable used to track H-Bridge
+    labJackFIOMask = 0b11111                                                # Variable sets FIO channel updates
+    labJackFIODir = 0b00111                                                 # Variable sets FIO channel direction
+    labJackFIOState = 0b11111                                               # Variable sets FIO channel state
+    inputScanRate = 100                                                     # Variable sets the input scans/sec
+    inputStreamRate = None                                                  # Variable sets UE9 stream scans/sec
+    speedUpdateInterval = 50                                                # Variable sets the ms between PWM writes
+    directionDeadTime = 100                                                 # Variable sets the ms of H-Bridge coast
+    autoReconnect = True                                                    # Variable sets reconnect on link loss
+    reconnectDelay = 100                                                    # Variable sets the first retry wait (ms)
+    reconnectMaxDelay = 5000                                                # Variable sets the longest retry wait
+    telemetryPath = None                                                    # Variable sets the telemetry log file
+    encoderPulsesPerRev = None                                              # Variable sets the encoder (None->off)
+    speedControlRate = 50                                                   # Variable sets the PI updates/sec
+    speedGains = (0.01, 0.2)                                                # Variable sets the PI gains (kp, ki)
+    maxDutyRate = 50                                                        # Variable sets the PI duty cycle %/sec
+    speedSetpoint = None                                                    # Variable used to track the RPM asked
+    rampProfile = None                                                      # Variable sets the ramp (None -> jump)
+    rampRate = 100                                                          # Variable sets the ramp duty cycle %/sec
+    rampStep = 1                                                            # Variable sets the ramp % per update
+    rampStartDuty = 30                                                      # Variable sets the duty a ramp starts at
+    rampOffMargin = 200                                                     # Variable sets the ms an OFF ramp may run late
+    # backendClass              Passed in the __init__ method               # Variable for the UE9 (real or sim)
+    # deliver                   Passed in the __init__ method               # Variable for the GUI thread handoff
+    # brakeListeners            Created in the __init__ method              # Variable for the E-Brake handlers
+    # resetListeners            Created in the __init__ method              # Variable for the Reset handlers
+    # connectionListeners       Created in the __init__ method              # Variable for the connection handlers
+    # instrumentation           Created in the __init__ method              # Variable for the timing numbers
+    # ipAddress                 Created in the connect method               # Variable for the LabJack IP Address
+    # labJackDriver             Created in the connect method               # Variable for the LabJack connection
+    # inputScanner              Created in the connect method               # Variable for the shared input scan
+    # labJackWorker             Created in the connect method               # Variable for the UE9 I/O thread
+    # speedCoalescer            Created in the connect method               # Variable for the latest speed value
+    # motorOutputs              Created in the connect method               # Variable for the UE9 output state
+    # directionSequencer        Created in the connect method               # Variable for the direction changes
+    # telemetry                 Created in the connect method               # Variable for the telemetry recorder
+    # speedLoop                 Created in the connect method               # Variable for the closed loop speed
+    # rampScheduler             Created in the connect method               # Variable for the speed ramps
+
+    def __init__(self, backendClass=UE9Backend, deliver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the MotorController object (not connected)
+        :param backendClass: This is the MotorDriverBackend class used for
+                             every connection. It's value is UE9Backend (the
+                             real LabJack) unless a simulator is passed
+        :param deliver: This is a function used to run the input checks on
+                        the GUI thread without waiting for it, e.g. a
+                        queue the Tk GUI polls. It's value is
+                        None to run them on the UE9 I/O thread (headless)
+        """
+        self.backendClass = backendClass                                    # Hold the UE9 backend class
+        self.deliver = deliver                                              # Hold the GUI thread handoff
+        self.brakeListeners = []                                            # Start with no E-Brake handlers
+        self.resetListeners = []                                            # Start with no Reset handlers
+        self.connectionListeners = []                                       # Start with no connection handlers
+        self.instrumentation = Instrumentation()                            # Start with no timing numbers
+        self.ipAddress = None                                               # Start with no IP Address
+        self.labJackDriver = None                                           # Start with no LabJack connection
+        self.labJackWorker = None                                           # Start with no UE9 I/O thread
+        self.telemetry = None                                               # Start with no telemetry recorder
+        self.speedLoop = None                                               # Start with no closed loop speed
+        self.rampScheduler = None                                           # Start with no speed ramps
+        self.runTimerValue = self.previousTimerValue                        # The Timer Value the motor runs at
+        self._reversing = 0                                                 # Number of the running reversal
+        self._stopping = 0                                                  # Number of the running ramp to OFF
+        self._connectLock = threading.Lock()                                # Lock for the connect attempts
+        self._connecting = False                                            # No connect thread is running
+        self._reconnecting = False                                          # No reconnect thread is running
+        self._closing = False                                               # The controller is not closed
+
+    def isConnected(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if a LabJack is connected
+        :return: True if the UE9 I/O thread has a LabJack that answers
+        """
+        return self.labJackWorker is not None and self.labJackWorker.linkUp
+
+    def connect(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to connect to the LabJack at the IP Address and
+        start (or hand the connection to) the UE9 I/O thread
+        :param ipAddress: This is the IP Address of the LabJack
+        :return: True if the LabJack is connected
+        """
+        try:
+            labJackDriver = InstrumentedBackend(self.backendClass(),
+                                                self.instrumentation)       # Create the (timed) UE9 backend
+            labJackDriver.connect(ipAddress)                                # Try to establish LabJack connection
+        except Exception:                                                   # If the IP is not of a LabJack UE9
+            logger.error("Failed to connect to LabJack at %s", ipAddress)   # Log -> Failed...
+            try:
+                labJackDriver.close()                                       # Close a half open connection
+            except Exception:                                               # If it was never created
+                pass
+            self._notifyConnection(False)                                   # Tell the listeners (not connected)
+            return False
+        self.ipAddress = ipAddress                                          # Hold the IP Address
+        self.labJackDriver = labJackDriver                                  # Hold the LabJack connection
+        logger.info("Connected to LabJack at %s", ipAddress)                # Log -> Connected...
+        if self.labJackWorker is not None:                                  # If the UE9 I/O thread is running
+            self.labJackWorker.setDriver(self.labJackDriver)                # Hand it the new LabJack connection
+        else:                                                               # If this is the first connection
+            if self.inputStreamRate:                                        # If the UE9 streams the inputs
+                self.inputScanner = StreamScanner(self.labJackDriver,
+                                                  self.inputStreamRate)     # Create the hardware timed scan
+            else:                                                           # If the inputs are polled
+                self.inputScanner = InputScanner(self.labJackDriver,
+                                                 self.inputScanRate)        # Create the shared input scan
+            self.inputScanner.addHandler(self.brakeCutoff)                  # Cut the motor on the I/O thread
+            if self.telemetryPath is not None:                              # If the scans are logged
+                self.telemetry = TelemetryRecorder(self.telemetryPath)      # Create the telemetry recorder
+                if isinstance(self.inputScanner, StreamScanner):            # If the UE9 streams the inputs
+                    self.inputScanner.addBlockHandler(self.recordTelemetryBlock)    # Log every scan of a block
+                else:                                                       # If the inputs are polled
+                    self.inputScanner.addHandler(self.recordTelemetry)      # Log every scan on the I/O thread
+            self.labJackWorker = LabJackWorker(self.labJackDriver,
+                                               self.inputScanner,
+                                               self.deliver)                # Create the UE9 I/O thread
+            self.labJackWorker.addInputListener(self.processInputs)         # Pass the FIO bits to the checks
+            self.labJackWorker.instrumentation = self.instrumentation       # Time the input scans
+            self.labJackWorker.linkListeners.append(self.linkChanged)       # Reconnect if the link is lost
+            self.speedCoalescer = CommandCoalescer(self.driveSpeed,
+                                                   self.speedUpdateInterval)    # Keep the newest speed
+            self.labJackWorker.addCoalescer(self.speedCoalescer)            # Let the I/O thread write the speed
+            self.motorOutputs = MotorOutputs(self.labJackFIOMask,
+                                             self.labJackFIODir,
+                                             self.labJackFIOState)          # Track the UE9 output state
+            self.directionSequencer = DirectionSequencer(self.labJackWorker,
+                                                         self.motorOutputs,
+                                                         self.directionDeadTime)    # Coast->Wait->Drive
+            if self.encoderPulsesPerRev and self.labJackFIODir & MotorOutputs.counterPin:
+                logger.error("No closed loop speed: Counter0 would take FIO1, "
+                             "which drives Motor Terminal 1 (Forward)")     # Log -> Counter0 pin is an output
+            elif self.encoderPulsesPerRev:                                  # If an encoder is wired
+                self.motorOutputs.counterEnabled = True                     # Count the encoder pulses
+                kp, ki = self.speedGains
+                self.speedLoop = ClosedLoopSpeed(self.labJackWorker, self.motorOutputs,
+                                                 self.encoderPulsesPerRev, self.speedControlRate,
+                                                 PIController(kp, ki, maxRate=self.maxDutyRate))
+            if self.rampProfile is not None:                                # If the speed changes are ramped
+                self.rampScheduler = RampScheduler(self.labJackWorker, self.motorOutputs,
+                                                   RampProfile(self.rampProfile, self.rampRate,
+                                                               self.rampStep))  # Create the ramp scheduler
+            self._addGauges()                                               # Export the I/O thread numbers
+            self.labJackWorker.start()                                      # Start the UE9 I/O thread
+        self.labJackWorker.submit(self.motorOutputs.configure)              # Set up the clock once per connection
+        self.turnOff()                                                      # Start with the circuit OFF
+        self._notifyConnection(True)                                        # Tell the listeners (connected)
+        return True
+
+    def connectAsync(self, ipAddress):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to connect to the LabJack on a background
+        thread so the GUI never waits for it. The connection listeners are
+        told the result
+        :param ipAddress: This is the IP Address of the LabJack
+        :return: False if a connect attempt is already running
+        """
+        with self._connectLock:
+            if self._connecting:                                            # If a connect attempt is running
+                return False
+            self._connecting = True                                         # Set a connect attempt as running
+
+        def connectThread():
+            try:
+                self.connect(ipAddress)                                     # Try to establish LabJack connection
+            finally:
+                self._connecting = False                                    # Allow the next connect attempt
+        threading.Thread(target=connectThread, name="LabJackConnect",
+                         daemon=True).start()                               # Start the connect thread
+        return True
+
+    def linkChanged(self, linkUp):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is called by the UE9 I/O thread when the LabJack stops
+        (or starts again) answering. A lost link turns the circuit OFF in the
+        controller and starts reconnecting with a growing wait (backoff)
+        :param linkUp: This is True if the LabJack answers again
+        """
+        if linkUp:                                                          # If the LabJack answers again
+            self.labJackWorker.submit(self.motorOutputs.configure)          # Put the outputs in the OFF state
+            self._notifyConnection(True)                                    # Tell the listeners (connected)
+            return
+        logger.error("Lost connection to LabJack at %s", self.ipAddress)    # Log -> Lost connection
+        self.driverOn = False                                               # The UE9 pins can't be trusted
+        self._abortMotion()                                                 # Stop any direction change or ramp
+        self.motorOutputs.configured = False                                # Set the outputs up again later
+        self.motorRunning = False                                           # Set the circuit operation to FALSE
+        self.currentDirection = self.NO_DIRECTION                           # The H-Bridge drives no direction
+        self._notifyConnection(False)                                       # Tell the listeners (not connected)
+        with self._connectLock:
+            if not self.autoReconnect or self._reconnecting or self._closing:   # If no reconnect is wanted
+                return
+            self._reconnecting = True                                       # Set a reconnect as running
+        threading.Thread(target=self._reconnect, name="LabJackReconnect",
+                         daemon=True).start()                               # Start the reconnect thread
+
+    def _reconnect(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to connect again to the last IP Address until
+        it works, doubling the wait after every failed attempt
+        """
+        delay = self.reconnectDelay                                         # Start with the first retry wait
+        try:
+            while not self._closing and not self.labJackWorker.linkUp:      # While the link is still down
+                if self.connect(self.ipAddress):                            # If the LabJack is connected again
+                    break
+                time.sleep(delay / 1000)                                    # Wait before the next attempt
+                delay = min(delay * 2, self.reconnectMaxDelay)              # Double the wait (up to the max)
+        finally:
+            self._reconnecting = False                                      # Allow the next reconnect
+
+    def _notifyConnection(self, connected):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to tell every connection listener if the
+        LabJack is connected, on the GUI thread if there is one
+        :param connected: This is True if the LabJack is connected
+        """
+        for listener in list(self.connectionListeners):                     # For every connection listener
+            if self.deliver is None:                                        # If there is no GUI thread
+                listener(connected)                                         # Call it right here
+            else:                                                           # If there is a GUI thread
+                self.deliver(listener, connected)                           # Call it on the GUI thread
+
+    def close(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn the motor driver circuit OFF and stop
+        the UE9 I/O thread once the OFF packets are sent (it closes the
+        LabJack connection last)
+        """
+        self._closing = True                                                # Stop any reconnect attempts
+        self.turnOff()                                                      # Call the turnOff method
+        if self.labJackWorker is not None:                                  # If the UE9 I/O thread was started
+            self.labJackWorker.submit(self.inputScanner.stop)               # Stop the input scans on the UE9
+            self.labJackWorker.stop()                                       # Send the OFF command and stop it
+        if self.telemetry is not None:                                      # If the scans are logged
+            self.telemetry.close()                                          # Write the last samples
+
+    def turnOn(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn the motor driver circuit on
+        :return: False if the circuit was not turned on: no LabJack was ever
+                 connected, or the E-Brake has been triggered (a Reset is
+                 needed, eBrakePressed is True)
+        """
+        if self.labJackWorker is None:                                      # If no LabJack was ever connected
+            logger.warning("Not connected to a LabJack")                    # Log -> Not connected
+            return False
+        if self.eBrakePressed:                                              # If the E-Brake has been triggered
+            return False
+        self.motorRunning = True                                            # Set the circuit operation to TRUE
+        self.currentDirection = self.NO_DIRECTION                           # The En pin alone drives no direction
+        self.labJackWorker.submit(self.driveOn, self.previousTimerValue)    # Queue the ON packets
+        if self.speedSetpoint is not None:                                  # If a speed was held before
+            self.labJackWorker.submit(self.driveSetpoint, self.speedSetpoint)   # Hold it again
+
+        logger.info("Motor Driver is ON")                                   # Log -> ON
+        return True
+
+    def turnOff(self, turnOFF=False):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn the motor driver circuit off
+        :param turnOFF: This is a boolean value used to check if the Turn OFF
+                        command was used to stop the Driver (Motor) instead of
+                        the Emergency Button being triggered.
+                        It's value is False if the E-Brake button is used
+        """
+        if self.motorRunning:                                               # If the Driver (Motor) is ON
+            self.motorRunning = False                                       # Set the circuit operation to FALSE
+            if self.rampScheduler is None or self.eBrakePressed or self._closing:   # If it must stop at once
+                self.labJackWorker.submit(self.driveOff)                    # Queue the OFF packets
+            else:                                                           # If it can slow down first
+                self.labJackWorker.submit(self.rampOff)                     # Queue the ramp down and OFF
+        self.currentDirection = self.NO_DIRECTION                           # The H-Bridge drives no direction
+        if turnOFF:                                                         # If the Turn Off command is used
+            self.previousDirection = self.NO_DIRECTION                      # Set the direction variable to NONE
+
+        logger.info("Motor Driver is OFF")                                  # Log -> OFF
+
+    def setDirection(self, direction):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to rotate the motor in a direction
+        :param direction: This is MotorController.FORWARD or BACKWARD
+        """
+        if not self.motorRunning or self.labJackWorker is None:             # If the Driver (Motor) is OFF
+            return
+        self.labJackWorker.submit(self.driveDirection,
+                                  self.directionStates[direction])          # Queue the En, direction pins low
+        self.previousDirection = direction                                  # Set the direction variable
+        self.currentDirection = direction                                   # Set the H-Bridge direction
+
+        if direction == self.FORWARD:
+            logger.info("Motor Driver in FORWARD Direction")                # Log -> FORWARDS
+        else:
+            logger.info("Motor Driver in BACKWARDS Direction")              # Log -> BACKWARDS
+
+    def setDutyCycle(self, dutyCycle):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to control the speed of the motor
+        :param dutyCycle: This is an integer value from 30 to 100
+        The PWM frequency is (732.421875 Hz)
+        """
+        if self.motorRunning and self.labJackWorker is not None:            # If the Driver (Motor) is ON
+            if self.speedSetpoint is not None:                              # If a speed is being held
+                self.speedSetpoint = None                                   # The duty cycle is set by hand now
+                self.labJackWorker.submit(self.speedLoop.stop)              # Stop the closed loop speed
+            dCTimerValue = dutyToTimerValue(int(dutyCycle))                 # Convert the D.C. -> Timer Value
+            if dCTimerValue == self.previousTimerValue:                     # If the Timer Value did not change
+                return                                                      # Skip the timer write
+            self.labJackWorker.offer(self.speedCoalescer, dCTimerValue)     # Hand over the newest Timer Value
+            self.previousTimerValue = dCTimerValue                          # Update the timer value variable
+
+    def setSpeed(self, rpm):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hold the motor at a speed. The PI controller
+        on the UE9 I/O thread sets the duty cycle from the encoder speed
+        :param rpm: This is the speed asked for in RPM
+        :return: False if there is no encoder (encoderPulsesPerRev not set,
+                 or FIO1 is an output and can't count the encoder)
+        """
+        if self.speedLoop is None:                                          # If there is no encoder
+            return False
+        self.speedSetpoint = float(rpm)                                     # Hold the RPM asked for
+        if self.motorRunning:                                               # If the Driver (Motor) is ON
+            self.labJackWorker.submit(self.driveSetpoint, self.speedSetpoint)   # Queue the new setpoint
+        logger.info("Speed setpoint at %d RPM", self.speedSetpoint)         # Log -> RPM setpoint
+        return True
+
+    def emergencyBrake(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to trigger the E-Brake from software, just like
+        the E-Brake button: the OFF packets are sent at once (even during a
+        ramp to OFF), the E-Brake is latched and the E-Brake listeners are
+        called. A Reset is needed to turn the motor on again
+        :return: False if no LabJack was ever connected
+        """
+        if self.labJackWorker is None:                                      # If no LabJack was ever connected
+            logger.warning("Not connected to a LabJack")                    # Log -> Not connected
+            return False
+        logger.warning("EMERGENCY BRAKE Triggered")                         # Log -> EMERGENCY BRAKE
+
+        self.eBrakePressed = True                                           # Set Brake triggered variable True
+        self.turnOff()                                                      # Call the turnOff method
+        self.labJackWorker.submit(self.driveOff)                            # Queue the OFF packets (no ramp)
+        for listener in list(self.brakeListeners):                          # For every E-Brake listener
+            listener()                                                      # Tell it the E-Brake was triggered
+        return True
+
+    def requestReset(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to ask for a Reset (password) after the
+        E-Brake was triggered. Every Reset listener is called once until
+        the Reset is confirmed
+        """
+        if self.resetPressed:                                               # If a Reset is already waiting
+            return
+        logger.warning("RESET Triggered")                                   # Log -> RESET
+
+        self.resetPressed = True                                            # Set Reset triggered variable True
+        for listener in list(self.resetListeners):                          # For every Reset listener
+            listener()                                                      # Ask it for the password
+
+    def confirmReset(self, password):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check the Reset password and if it matches,
+        clear the E-Brake and start the motor in its previous direction
+        :param password: This is the password that was entered
+        :return: True if the password matched
+        """
+        if password != self.resetPassword:                                  # If the password doesn't match
+            return False
+        self.eBrakePressed = False                                          # Set Brake triggered variable False
+        self.turnOn()                                                       # Call the turnOn method
+        if self.previousDirection != self.NO_DIRECTION:                     # If there was a direction
+            self.setDirection(self.previousDirection)                       # Go in the same direction
+        self.resetPressed = False                                           # Set Reset triggered variable False
+        return True
+
+    def processInputs(self, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if the emergency stop or the reset
+        has been triggered. An E-Brake turns the circuit off and calls the
+        E-Brake listeners, a Reset after an E-Brake calls requestReset
+        :param fioState: This is the FIO state byte read by the input scan
+        """
+        if not fioState & 0b10000 and not self.motorRunning and self.eBrakePressed:    # If Reset pressed
+            self.requestReset()                                             # Ask for the Reset password
+        if not fioState & 0b01000 and self.motorRunning:                    # If Circuit ON and E-Brake pressed
+            logger.warning("EMERGENCY BRAKE Triggered")                     # Log -> EMERGENCY BRAKE
+
+            self.eBrakePressed = True                                       # Set Brake triggered variable True
+            self.turnOff()                                                  # Call the turnOff method
+            for listener in list(self.brakeListeners):                      # For every E-Brake listener
+                listener()                                                  # Tell it the E-Brake was triggered
+
+    def driveOn(self, labJackDriver, timerValue):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send the ON packets to the LabJack.
+        It runs on the UE9 I/O thread
+        :param labJackDriver: This is the LabJack connection
+        :param timerValue: This is the PWM timer value to start with
+        """
+        self._abortMotion()                                                 # Stop a ramp down to OFF (if any)
+        self._stopping += 1                                                 # Cancel its OFF fallback
+        self.runTimerValue = timerValue                                     # Hold the Timer Value to run at
+        if self.rampScheduler is not None:                                  # If the speed changes are ramped
+            timerValue = self._rampStartValue()                             # Start low, ramp up with a direction
+        self.motorOutputs.apply(labJackDriver, fioState=0b11110,            # Turn the Enable pin to low->Turn ON
+                                timerValue=timerValue,                      # Set the Timer Value
+                                timerEnabled=True)                          # Turn the PWM timer on
+        self.driverOn = True                                                # Set the UE9 pin operation to TRUE
+        self.speedCoalescer.markWritten(self.runTimerValue)                 # The timer already has this value
+
+    def driveOff(self, labJackDriver):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send the OFF packets to the LabJack.
+        It runs on the UE9 I/O thread
+        :param labJackDriver: This is the LabJack connection
+        """
+        self.driverOn = False                                               # Set the UE9 pin operation to FALSE
+        self._abortMotion()                                                 # Stop any direction change or ramp
+        self.motorOutputs.apply(labJackDriver, fioState=0b11111,            # Turn the Enable pin to hi->Turn OFF
+                                timerValue=0,                               # Set the Timer Value
+                                timerEnabled=False)                         # Turn the PWM timer off
+
+    def driveDirection(self, labJackDriver, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn the H-Bridge off, wait the dead time
+        and then turn it on in the new direction. The wait is a timer on the
+        UE9 I/O thread, so the GUI and the E-Brake check keep running
+        :param labJackDriver: This is the LabJack connection
+        :param fioState: This is the FIO state for the new direction
+        """
+        if not self.driverOn:                                               # If the E-Brake stopped the motor
+            return                                                          # Keep the Driver (Motor) off
+        if self.rampScheduler is None or (self.speedLoop is not None and self.speedLoop.running):
+            self.directionSequencer.start(labJackDriver, fioState)          # Coast -> Dead Time -> Drive
+            return
+        if self._reversing and fioState == self.motorOutputs.fioState:      # If asked back while slowing down
+            self._reversing = 0                                             # Cancel the reversal
+            self.rampScheduler.start(labJackDriver, self.runTimerValue)     # Speed back up
+            return
+        self._reversing += 1                                                # Start a new reversal
+        if self._driving():                                                 # If the motor turns the other way
+            self.rampScheduler.start(labJackDriver, self._rampStartValue(),
+                                     lambda driver: self._reverse(driver, fioState))    # Slow down first
+        else:                                                               # If the motor is not driven yet
+            self.rampScheduler.abort()                                      # Stop any ramp
+            self.motorOutputs.apply(labJackDriver, timerValue=self._rampStartValue())
+            self._reverse(labJackDriver, fioState)                          # Drive it from the start duty
+
+    def rampOff(self, labJackDriver):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to slow the motor down with the ramp and then
+        send the OFF packets. An E-Brake during the ramp turns it off at
+        once. If the ramp (or its OFF packets) fails, the OFF packets are
+        sent again once the ramp should have ended. It runs on the UE9 I/O
+        thread
+        :param labJackDriver: This is the LabJack connection
+        """
+        if not self.driverOn:                                               # If the E-Brake stopped the motor
+            return
+        if not self._driving():                                             # If the motor is not driven
+            self.driveOff(labJackDriver)                                    # Turn it off right away
+            return
+        self._reversing = 0                                                 # Cancel any reversal
+        self.directionSequencer.abort()                                     # Stop any direction change
+        self._stopping += 1                                                 # Start a new ramp to OFF
+        duration = self.rampScheduler.profile.duration(self.motorOutputs.timerValue,
+                                                       self._rampStartValue())
+        self.rampScheduler.start(labJackDriver, self._rampStartValue(),
+                                 self.driveOff)                             # Slow down, then turn OFF
+        self.labJackWorker.callLater(duration + self.rampOffMargin,
+                                     self._offFallback, self._stopping)     # Make sure the OFF packets go out
+
+    def _offFallback(self, labJackDriver, stopping):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send the OFF packets if a ramp to OFF did
+        not get the motor off in time, and to check again until they are
+        sent. It does nothing if the motor was turned on again or the
+        outputs are already off
+        :param labJackDriver: This is the LabJack connection
+        :param stopping: This is the number of the ramp that scheduled it
+        """
+        if stopping != self._stopping or self.motorRunning:                 # If the motor was turned on again
+            return
+        outputs = self.motorOutputs
+        if outputs.timerEnabled or outputs.fioState != outputs.offState:    # If the UE9 still drives the motor
+            logger.warning("Ramp to OFF did not finish, sending OFF")       # Log -> Ramp failed
+            try:
+                self.driveOff(labJackDriver)                                # Send the OFF packets again
+            finally:
+                self.labJackWorker.callLater(self.rampOffMargin,
+                                             self._offFallback, stopping)   # Check again until it is off
+
+    def _reverse(self, labJackDriver, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to change the direction at the start duty and
+        ramp back up to the running Timer Value once the dead time is over
+        :param labJackDriver: This is the LabJack connection
+        :param fioState: This is the FIO state for the new direction
+        """
+        reversal = self._reversing
+        self.directionSequencer.start(labJackDriver, fioState)              # Coast -> Dead Time -> Drive
+        self.labJackWorker.callLater(self.directionDeadTime, self._rampUp, reversal)
+
+    def _rampUp(self, labJackDriver, reversal):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to ramp up to the running Timer Value once the
+        new direction is driven. It does nothing if the reversal was stopped
+        :param labJackDriver: This is the LabJack connection
+        :param reversal: This is the number of the reversal that scheduled it
+        """
+        if reversal != self._reversing or not self.driverOn:                # If the reversal was stopped
+            return
+        self._reversing = 0                                                 # The reversal is done
+        self.rampScheduler.start(labJackDriver, self.runTimerValue)         # Speed up
+
+    def _driving(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to check if the H-Bridge drives a direction
+        :return: True if the UE9 pins drive Forwards or Backwards
+        """
+        return self.motorOutputs.fioState in self.directionStates.values()
+
+    def _rampStartValue(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the Timer Value a ramp starts/ends at
+        :return: The Timer Value of rampStartDuty
+        """
+        return dutyToTimerValue(self.rampStartDuty)
+
+    def _abortMotion(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop any direction change, ramp or closed
+        loop speed at once (OFF, E-Brake or a lost link)
+        """
+        self.directionSequencer.abort()                                     # Stop any direction change
+        self._reversing = 0                                                 # Stop any reversal
+        if self.rampScheduler is not None:                                  # If the speed changes are ramped
+            self.rampScheduler.abort()                                      # Stop any ramp
+        if self.speedLoop is not None:                                      # If there is an encoder
+            self.speedLoop.stop()                                           # Stop the closed loop speed
+
+    def driveSpeed(self, labJackDriver, timerValue):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send a new PWM timer value to the LabJack.
+        It runs on the UE9 I/O thread
+        :param labJackDriver: This is the LabJack connection
+        :param timerValue: This is the new PWM timer value
+        """
+        if not self.driverOn:                                               # If the E-Brake stopped the motor
+            return                                                          # Keep the timer off
+        self.runTimerValue = timerValue                                     # Hold the Timer Value to run at
+        if self.rampScheduler is not None and self._driving():              # If the speed change is ramped
+            if not self._reversing:                                         # If no reversal is running
+                self.rampScheduler.start(labJackDriver, timerValue)         # Ramp to the new Timer Value
+        elif not self._reversing:                                           # If no reversal is running
+            self.motorOutputs.apply(labJackDriver, timerValue=timerValue)   # Send the Timer Value only
+
+        logger.debug("Duty Cycle at %d %% = %d",
+                     round(timerValue / 655.35), timerValue)                # Log -> D.C., Timer Value
+
+    def driveSetpoint(self, labJackDriver, rpm):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start (or update) the closed loop speed.
+        It runs on the UE9 I/O thread
+        :param labJackDriver: This is the LabJack connection
+        :param rpm: This is the speed asked for in RPM
+        """
+        if not self.driverOn:                                               # If the E-Brake stopped the motor
+            return                                                          # Keep the timer off
+        if self.rampScheduler is not None:                                  # If the speed changes are ramped
+            self.rampScheduler.abort()                                      # The PI controller takes over
+        self.speedLoop.start(labJackDriver, rpm)                            # Hold the speed
+
+    def brakeCutoff(self, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to turn the motor off the moment the E-Brake
+        pin is read. It runs on the UE9 I/O thread, so the brake never
+        waits for the GUI. The E-Brake is latched here too, so the motor
+        can't be turned on again without a Reset even before the GUI gets
+        to it. The processInputs method handles the rest later
+        :param fioState: This is the FIO state byte read by the input scan
+        """
+        if not fioState & 0b01000 and self.driverOn:                        # If E-Brake pressed and Driver ON
+            start = time.perf_counter()                                     # Start the E-Brake timer
+            self.eBrakePressed = True                                       # Latch the E-Brake (Reset needed)
+            self.driveOff(self.labJackWorker.labJackDriver)                 # Send the OFF packets right away
+            self.instrumentation.record("brakeToMotorOff",
+                                        time.perf_counter() - start)        # Record E-Brake read -> OFF sent
+
+    def recordTelemetry(self, fioState):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add an input scan to the telemetry log with
+        the Timer Value and direction on the UE9. It runs on the I/O thread
+        :param fioState: This is the FIO state byte read by the input scan
+        """
+        self.telemetry.record(fioState, *self._telemetryOutputs())          # Add the sample to the ring buffer
+
+    def recordTelemetryBlock(self, fioStates):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add every scan of a UE9 stream read to the
+        telemetry log in one bulk append. It runs on the I/O thread
+        :param fioStates: This is the FIO state of every scan as bytes
+        """
+        self.telemetry.recordBlock(fioStates, *self._telemetryOutputs(),
+                                   1.0 / self.inputScanner.scanRate)        # Add the block to the ring buffer
+
+    def _telemetryOutputs(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the Timer Value and direction on the UE9
+        for the telemetry log
+        :return: The (Timer Value (0 if off), direction) pair
+        """
+        outputs = self.motorOutputs
+        if outputs.fioState == self.directionStates[self.FORWARD]:          # If the H-Bridge drives Forwards
+            direction = self.FORWARD
+        elif outputs.fioState == self.directionStates[self.BACKWARD]:       # If the H-Bridge drives Backwards
+            direction = self.BACKWARD
+        else:                                                               # If it drives no direction
+            direction = self.NO_DIRECTION
+        return outputs.timerValue if outputs.timerEnabled else 0, direction
+
+    def _addGauges(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add the UE9 I/O thread numbers to the
+        timing export, so the scan rate can be compared to the one asked for
+        """
+        gauges = {"requestedScanInterval": lambda: 1.0 / self.inputScanner.tickRate,
+                  "scansPerSecond": lambda: self.inputScanner.packetsPerSecond,
+                  "commandsFailed": lambda: self.labJackWorker.commandsFailed,
+                  "linkUp": lambda: self.labJackWorker.linkUp,
+                  "outputPacketsSent": lambda: self.motorOutputs.packetsSent,
+                  "speedUpdatesSent": lambda: self.speedCoalescer.updatesSent,
+                  "speedUpdatesDropped": lambda: self.speedCoalescer.updatesDropped}
+        if isinstance(self.inputScanner, StreamScanner):                    # If the UE9 streams the inputs
+            gauges["streamScansRead"] = lambda: self.inputScanner.samplesRead
+            gauges["brakePresses"] = lambda: self.inputScanner.pressEdges[0b01000]
+        if self.rampScheduler is not None:                                  # If the speed changes are ramped
+            gauges["rampUpdatesSent"] = lambda: self.rampScheduler.updatesSent
+            gauges["rampsAborted"] = lambda: self.rampScheduler.rampsAborted
+            gauges["rampUpdatesFailed"] = lambda: self.rampScheduler.updatesFailed
+        for name, gauge in gauges.items():                                  # For every I/O thread number
+            self.instrumentation.addGauge(name, gauge)                      # Read it when exported
+
+    def status(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the state of the motor driver
+        :return: A dictionary with the state of the motor driver
+        """
+        directions = {self.FORWARD: "FORWARD", self.BACKWARD: "BACKWARDS",
+                      self.NO_DIRECTION: "NONE"}
+        return {"connected": self.isConnected(),
+                "running": self.motorRunning,
+                "direction": directions[self.currentDirection],
+                "dutyCycle": round(self.previousTimerValue / 655.35),
+                "eBrake": self.eBrakePressed,
+                "resetPending": self.resetPressed,
+                "packetsPerSecond": (self.inputScanner.packetsPerSecond
+                                     if self.labJackWorker is not None else 0.0),
+                "rpmSetpoint": self.speedSetpoint,
+                "rpm": round(self.speedLoop.rpm) if self.speedLoop is not None else None}
+# End of Class
+
+
+COMMAND_USAGE = {"duty": "duty <30-100>", "rpm": "rpm <setpoint>",
+                 "wait": "wait <0-3600000 ms>", "reset": "reset <password>",
+                 "metrics": "metrics <path>"}                               # Usage of the commands with a value
+NUMBER_COMMANDS = ("duty", "rpm", "wait")                                   # Commands with a number value
+MAX_WAIT = 3600000                                                          # Longest wait command (1 hour in ms)
+
+
+def runCommand(controller, line):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to run one command line command on the controller.
+    A command with a missing value or a bad number prints its usage
+    instead of stopping
+    :param controller: This is the MotorController
+    :param line: This is the command, e.g. "duty 80"
+    :return: False if the command was quit, True otherwise
+    """
+    words = line.split()                                                    # Split the command from its value
+    if not words or words[0].startswith("#"):                               # If the line is empty (or a comment)
+        return True
+    command, values = words[0].lower(), words[1:]
+    if command == "quit":                                                   # If the command is quit
+        return False
+    try:
+        if command in COMMAND_USAGE and not values:                         # If the value is missing
+            raise ValueError(command)
+        number = float(values[0]) if command in NUMBER_COMMANDS else None
+        if number is not None and not math.isfinite(number):                # If it is nan or inf
+            raise ValueError(values[0])
+    except ValueError:                                                      # If the value is not a number
+        print("Usage:", COMMAND_USAGE[command])                             # Console -> print the usage
+        return True
+    if command == "on":
+        if not controller.turnOn() and controller.eBrakePressed:            # If the E-Brake has been triggered
+            controller.requestReset()                                       # Ask for the Reset password
+    elif command == "off":
+        controller.turnOff(True)                                            # Turn off and forget the direction
+    elif command == "forward":
+        controller.setDirection(MotorController.FORWARD)                    # Go Forwards
+    elif command == "backward":
+        controller.setDirection(MotorController.BACKWARD)                   # Go Backwards
+    elif command == "brake":
+        controller.emergencyBrake()                                         # Trigger the E-Brake
+    elif command == "duty":
+        controller.setDutyCycle(min(100, max(30, int(number))))             # Set the D.C. (30 -> 100)
+    elif command == "rpm":
+        if not controller.setSpeed(number):                                 # If there is no encoder
+            print("No closed loop speed (needs --encoder-ppr and FIO1 free)")   # Console -> print No encoder
+    elif command == "reset":
+        if not controller.confirmReset(values[0]):                          # If the password doesn't match
+            print("Wrong RESET password")                                   # Console -> print Wrong password
+    elif command == "status":
+        print(controller.status())                                          # Console -> print the state
+    elif command == "stats":
+        print(controller.instrumentation.dump())                            # Console -> print the timing
+    elif command == "metrics":
+        controller.instrumentation.writePrometheus(values[0])               # Write the Prometheus text file
+    elif command == "wait":
+        time.sleep(min(max(0.0, number), MAX_WAIT) / 1000)                  # Wait the milli seconds (0 -> 1 hour)
+    else:
+        print("Unknown command:", line.strip())                             # Console -> print Unknown
+    return True
+
+
+def main(argv=None):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is the command line entry point. It connects to the
+    LabJack (or the simulated UE9) and runs the commands without any GUI
+    :param argv: These are the command line arguments (sys.argv if None)
+    :return: The exit code (0 -> OK, 1 -> not connected)
+    """
+    parser = argparse.ArgumentParser(description="Headless LabJack UE9 DC Motor Driver")
+    parser.add_argument("ip", nargs="?", default="127.0.0.1",
+                        help="IP Address of the LabJack UE9")
+    parser.add_argument("--simulate", action="store_true",
+                        help="use the simulated UE9 instead of the LabJack")
+    parser.add_argument("-c", "--command", action="append", default=[],
+                        help="command to run (can be repeated), stdin is read if none")
+    parser.add_argument("--scan-rate", type=int, default=MotorController.inputScanRate,
+                        help="E-Brake/Reset input scans per second")
+    parser.add_argument("--stream-rate", type=int,
+                        help="have the UE9 stream the inputs at this many scans per second")
+    parser.add_argument("--encoder-ppr", type=int,
+                        help="encoder pulses per turn on Counter0 (turns on the rpm command)")
+    parser.add_argument("--ramp", choices=(RampProfile.TRAPEZOID, RampProfile.S_CURVE),
+                        help="ramp the duty cycle on start, stop, speed change and reversal")
+    parser.add_argument("--ramp-rate", type=float, default=MotorController.rampRate,
+                        help="steepest ramp in duty cycle %% per second")
+    parser.add_argument("--log-level", default="INFO",
+                        help="lowest log level shown (DEBUG shows every duty cycle)")
+    parser.add_argument("--metrics-file",
+                        help="write the timing numbers here (Prometheus text) on exit")
+    parser.add_argument("--telemetry",
+                        help="log every input scan, Timer Value and direction to this file")
+    arguments = parser.parse_args(argv)
+    configureLogging(arguments.log_level)                                   # Write the log to the console
+
+    controller = MotorController(SimulatedUE9Backend if arguments.simulate else UE9Backend)
+    controller.inputScanRate = arguments.scan_rate                          # Set the input scans/sec
+    controller.telemetryPath = arguments.telemetry                          # Set the telemetry log file
+    controller.inputStreamRate = arguments.stream_rate                      # Set the UE9 stream scans/sec
+    controller.encoderPulsesPerRev = arguments.encoder_ppr                  # Set the encoder pulses/rev
+    controller.rampProfile = arguments.ramp                                 # Set the ramp profile
+    controller.rampRate = arguments.ramp_rate                               # Set the ramp duty cycle %/sec
+    controller.brakeListeners.append(lambda: print("Enter 'reset <password>' to continue"))
+    if not controller.connect(arguments.ip):                                # If the LabJack is not connected
+        return 1
+    commands = arguments.command or sys.stdin                               # Use the -c commands or stdin
+    try:
+        for line in commands:                                               # For every command
+            if not runCommand(controller, line):                            # If the command was quit
+                break
+    except KeyboardInterrupt:                                               # If Ctrl+C was pressed
+        pass
+    finally:
+        controller.close()                                                  # Turn OFF and stop the I/O thread
+        if arguments.metrics_file:                                          # If a metrics file was asked for
+            controller.instrumentation.writePrometheus(arguments.metrics_file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,41 +24,80 @@ Operating Frequency:
         732.42 Hz -> 48MHz / 1 / 65536
 """
 
+import os                                                                   # Library for the image paths
+import queue                                                                # Library for the GUI thread calls
 from tkinter import *                                                       # Library for the GUI
-import os                                                                   # Library for checking correct UE9 IP
-#import ue9                                                                 # Library to send/receive data
-#import LabJackPython                                                       # Library for LabJack communication
+from instrumentation import configureLogging, logger                        # Library for the console log
+from motor_backend import UE9Backend                                        # Library for LabJack communication
+from motor_controller import MotorController                                # Library for the motor control core
+
+
+class ImageCache:
+    directory = os.path.dirname(os.path.abspath(__file__))                  # Variable for the image folder
+    # images                    Created in the __init__ method              # Variable for the loaded images
+
+    def __init__(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the ImageCache object (no image loaded)
+        """
+        self.images = {}                                                    # Start with no loaded images
+
+    def get(self, name):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get an image. It is loaded from the folder
+        of this file the first time it is used and kept for every later use
+        :param name: This is the file name of the image, e.g. "on.png"
+        :return: The PhotoImage
+        """
+        image = self.images.get(name)
+        if image is None:                                                   # If it was not loaded yet
+            image = PhotoImage(file=os.path.join(self.directory, name))     # Load it (once)
+            self.images[name] = image                                       # Hold it for the next use
+        return image
+# End of Class
 
 
 class MotorDriver:
-    resetPressed = False                                                    # Variable used to check Reset press
-    eBrakePressed = False                                                   # Variable used to check Brake press
-    motorRunning = False                                                    # Variable used to check operation
-    previousTimerValue = int(60 * 655.35)                                   # Variable used to track PWM value
-    previousDirection = 2                                                   # Variable used to track direction
-    labJackFIOMask = 0b11111                                                # Variable sets FIO channel updates
-    labJackFIODir = 0b00111                                                 # Variable sets FIO channel direction
-    labJackFIOState = 0b11111                                               # Variable sets FIO channel state
-    # labJackDriver             Created in the setLabJackIP method          # Variable for the LabJack connection
+    deferredBuildDelay = 50                                                 # Variable sets the ms until the banner
+    guiPollInterval = 10                                                    # Variable sets the ms between GUI polls
+    # controller                Created in the __init__ method              # Variable for the motor control core
+    # images                    Created in the __init__ method              # Variable for the image cache
+    # guiCalls                  Created in the __init__ method              # Variable for the I/O thread calls
+    # buttonStates              Created in the __init__ method              # Variable for the shown button states
     # ip                        Created in the __init__ method              # Variable used to get the IP Address
-    # password                  Created in the reset method                 # Variable used to get the password
+    # rpm                       Created in the __init__ method              # Variable used to get the RPM setpoint
+    # eBrake                    Created in the _buildBrakeWindow method     # Variable for the eBrake window
+    # eReset                    Created in the _buildResetWindow method     # Variable for the eReset window
+    # password                  Created in the _buildResetWindow method     # Variable used to get the password
 
-    def __init__(self):
+    def __init__(self, backendClass=UE9Backend):
         """DOCUMENTATION GOES HERE"""
         """
         This function initializes the MotorDriver object with all the GUI elements
-        and their current states (Disabled or Enabled)
+        and their current states (Disabled or Enabled). The tittle banner and
+        the eBrake/eReset windows are built once the main window is shown
+        :param backendClass: This is the MotorDriverBackend class used for
+                             every connection. It's value is UE9Backend (the
+                             real LabJack) unless a simulator is passed
         """
         self.window = Tk()                                                  # The main GUI window
+        self.guiCalls = queue.Queue()                                       # Start with no I/O thread calls
+        self.controller = MotorController(backendClass, self.deliver)       # Create the motor control core
+        self.controller.brakeListeners.append(self.emergencyBrake)          # Show the eBrake window on E-Brake
+        self.controller.resetListeners.append(self.reset)                   # Show the eReset window on Reset
+        self.controller.connectionListeners.append(self.connectionChanged)  # Show the connection state
+        self.buttonStates = {}                                              # Start with no shown button states
+        self.images = ImageCache()                                          # Load the images on first use
+        self.eBrake = None                                                  # The eBrake window is not built
+        self.eReset = None                                                  # The eReset window is not built
         """
-        This frame contains the tittle of the program
+        This frame contains the tittle of the program. It is empty until the
+        banner is built (_buildDeferred)
         """
-        frmTittle = Frame()                                                 # Create a new frame (Tittle)
-        frmTittle.pack(side=TOP)                                            # Place it in the main window
-        picTittle = PhotoImage(file="etd555tittle.png")                     # Get an image for the ETD label
-        lblTittle = Label(frmTittle, image=picTittle)                       # Create the label
-        lblTittle.image = picTittle                                         # Hold a reference to the etd image
-        lblTittle.pack(side=TOP)                                            # Place it in the Tittle frame
+        self.frmTittle = Frame()                                            # Create a new frame (Tittle)
+        self.frmTittle.pack(side=TOP)                                       # Place it in the main window
         """
         This frame contains the entry box for the LabJack IP Address
         """
@@ -69,11 +108,9 @@ class MotorDriver:
         self.ip = Entry(frmIpAddress, bd=6, relief=RIDGE, justify=CENTER)   # Create a text entry box for the IP
         self.ip.bind("<Return>", self.setLabJackIP)                         # Bind the ENTER key to call a method
         self.ip.pack(side=LEFT)                                             # Place it in the IP Address frame
-        picConnect = PhotoImage(file="connect.png")                         # Get an image for the connect button
-        self.btnConnect = Button(frmIpAddress,
-                                 relief=FLAT, image=picConnect,
+        self.btnConnect = Button(frmIpAddress, relief=FLAT,
+                                 image=self.images.get("connect.png"),
                                  command=self.setLabJackIP)                 # Create the connect button
-        self.btnConnect.image = picConnect                                  # Hold a reference to the image
         self.btnConnect.pack(side=LEFT)                                     # Place it in the IP Address frame
         """
         This frame contains the status of the program. It includes the 
@@ -83,17 +120,13 @@ class MotorDriver:
         frmStatus = Frame(height=15)                                        # Create a new frame (Status)
         frmStatus.pack(side=TOP)                                            # Place it in the main window
         Label(frmStatus, text="STATUS").pack(side=LEFT)                     # Place a label in the Status frame
-        picOff = PhotoImage(file="off.png")                                 # Get an image for the OFF button
         self.btnOFF = Button(frmStatus, relief=FLAT,
-                             image=picOff, state=DISABLED,
+                             image=self.images.get("off.png"), state=DISABLED,
                              command=lambda: self.statusOff(True))          # Create the button
-        self.btnOFF.image = picOff                                          # Hold a reference to the off image
         self.btnOFF.pack(side=LEFT)                                         # Place it in the Status frame
-        picOn = PhotoImage(file="on.png")                                   # Get an image for the ON button
         self.btnON = Button(frmStatus, relief=FLAT,
-                            image=picOn, state=DISABLED,
+                            image=self.images.get("on.png"), state=DISABLED,
                             command=self.statusOn)                          # Create the button
-        self.btnON.image = picOn                                            # Hold a reference to the on image
         self.btnON.pack(side=LEFT)                                          # Place it in the Status frame
         """
         This frame contains the direction of the program. It includes the
@@ -103,17 +136,15 @@ class MotorDriver:
         frmDirection = Frame()                                              # Create a new frame (Direction)
         frmDirection.pack(side=TOP)                                         # Place it in the main window
         Label(frmDirection, text="DIRECTION").pack(side=LEFT)               # Place a label in the Direction frm
-        picBackwards = PhotoImage(file="backwards.png")                     # Get an image for the BACKWARDS btn
-        self.btnBackward = Button(frmDirection, image=picBackwards,
+        self.btnBackward = Button(frmDirection,
+                                  image=self.images.get("backwards.png"),
                                   relief=FLAT, state=DISABLED,
                                   command=self.backwardsDirection)          # Create the button
-        self.btnBackward.image = picBackwards                               # Hold a reference to the back image
         self.btnBackward.pack(side=LEFT)                                    # Place it in the Direction frame
-        picForwards = PhotoImage(file="forwards.png")                       # Get an image for the FORWARDS btn
-        self.btnForward = Button(frmDirection, image=picForwards,
+        self.btnForward = Button(frmDirection,
+                                 image=self.images.get("forwards.png"),
                                  relief=FLAT, state=DISABLED,
                                  command=self.forwardDirection)             # Create the button
-        self.btnForward.image = picForwards                                 # Hold a reference to the forward img
         self.btnForward.pack(side=LEFT)                                     # Place it in the Direction frame
         """
         This frame contains the speed of the program. It includes the
@@ -122,10 +153,8 @@ class MotorDriver:
         frmSpeed = Frame()                                                  # Create a new frame (Speed)
         frmSpeed.pack(side=TOP)                                             # Place it in the main window
         Label(frmSpeed, text="SPEED").pack(side=LEFT)                       # Place a label in the Speed frame
-        picSlow = PhotoImage(file="slowTurtle.png")                         # Get an image for the SLOW label
-        lblSlow = Label(frmSpeed, image=picSlow)                            # Create the label
-        lblSlow.image = picSlow                                             # Hold a reference to the slow image
-        lblSlow.pack(side=LEFT)                                             # Place it in the Speed frame
+        Label(frmSpeed,
+              image=self.images.get("slowTurtle.png")).pack(side=LEFT)      # Place the SLOW label
         self.speedSlider = Scale(frmSpeed, from_=30, to=100,
                                  orient='horizontal',
                                  length=int(self.window.winfo_screenwidth() / 4),
@@ -133,10 +162,19 @@ class MotorDriver:
         self.speedSlider.set(60)                                            # Set the default slider value to 60
         self.speedSlider.config(state=DISABLED, showvalue=0)                # Disable it and hide its value
         self.speedSlider.pack(side=LEFT, fill=X)                            # Place it in the Speed frame
-        picFast = PhotoImage(file="fastRabbit.png")                         # Get an image for the FAST label
-        lblFast = Label(frmSpeed, image=picFast)                            # Create the label
-        lblFast.image = picFast                                             # Hold a reference to the fast image
-        lblFast.pack(side=LEFT)                                             # Place it in the Speed frame
+        Label(frmSpeed,
+              image=self.images.get("fastRabbit.png")).pack(side=LEFT)      # Place the FAST label
+        """
+        This frame contains the RPM setpoint of the program. It is only
+        enabled if the controller has an encoder (closed loop speed)
+        """
+        frmRpm = Frame()                                                    # Create a new frame (RPM)
+        frmRpm.pack(side=TOP)                                               # Place it in the main window
+        Label(frmRpm, text="RPM").pack(side=LEFT)                           # Place a label in the RPM frame
+        self.rpm = Entry(frmRpm, bd=6, relief=RIDGE, justify=CENTER,
+                         state=DISABLED)                                    # Create a text entry box for the RPM
+        self.rpm.bind("<Return>", self.rpmControl)                          # Bind the ENTER key to call a method
+        self.rpm.pack(side=LEFT)                                            # Place it in the RPM frame
         self.window.resizable(False, False)                                 # Make it un-resizable
         self.window.title("Motor Driver")                                   # Set it's tittle to Motor Driver
         self.window.geometry(
@@ -146,6 +184,59 @@ class MotorDriver:
                       int(self.window.winfo_screenheight() / 3)))           # Set where the main window appears
         self.window.protocol("WM_DELETE_WINDOW", self.terminateProgram)     # Set what the 'X' window button does
         self.ip.focus()                                                     # Set the focus on the IP entry box
+        self.window.after(self.deferredBuildDelay, self._buildDeferred)     # Build the rest once it is shown
+        self.window.after(self.guiPollInterval, self.pollGuiCalls)          # Start running the I/O thread calls
+
+    def _buildDeferred(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to build what the main window does not need to
+        appear: the tittle banner (the largest image) and the eBrake/eReset
+        windows (hidden), so they show at once when they are needed
+        """
+        Label(self.frmTittle,
+              image=self.images.get("etd555tittle.png")).pack(side=TOP)     # Place the ETD label in the Tittle frm
+        if self.eBrake is None:                                             # If the E-Brake did not build it
+            self._buildBrakeWindow()                                        # Build the eBrake window (hidden)
+        if self.eReset is None:                                             # If the Reset did not build it
+            self._buildResetWindow()                                        # Build the eReset window (hidden)
+
+    def deliver(self, function, *args):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used by the UE9 I/O thread to run a function on the
+        GUI thread. It only queues the call and returns at once, so a busy
+        GUI never holds up the input scans (calling Tk from another thread
+        waits for the GUI thread)
+        :param function: This is the function to call on the GUI thread
+        :param args: These are the values passed to the function
+        """
+        self.guiCalls.put((function, args))                                 # Queue the call for the GUI thread
+
+    def pollGuiCalls(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run every queued I/O thread call on the GUI
+        thread and poll again after guiPollInterval. The next poll is set
+        first and a failed call is logged, so one error (e.g. a TclError)
+        never stops the E-Brake, Reset and connection updates
+        """
+        self.window.after(self.guiPollInterval, self.pollGuiCalls)          # Poll again later
+        while True:
+            try:
+                function, args = self.guiCalls.get_nowait()                 # Take the next queued call
+            except queue.Empty:                                             # If every call has run
+                break
+            try:
+                function(*args)                                             # Run it on the GUI thread
+            except Exception:                                               # If the call failed
+                logger.exception("GUI call %s failed", getattr(function, "__name__", function))
+
+    def run(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to run the main window in a loop
+        """
         self.window.mainloop()                                              # Run the main window in a loop
 
     def terminateProgram(self):
@@ -154,7 +245,7 @@ class MotorDriver:
         This function is used to handle the closing of the program
         by turning the motor driver circuit OFF before termination
         """
-        self.statusOff()                                                    # Call the statusOff method
+        self.controller.close()                                             # Turn OFF and stop the I/O thread
         self.window.destroy()                                               # Close the main GUI window
 
     def setLabJackIP(self, event=None):
@@ -167,50 +258,59 @@ class MotorDriver:
                       It's value is 'None' if the Connect button is used
         """
         ipAddress = self.ip.get()                                           # Get the value from the IP entry box
-        if not os.system("ping -n 1 " + ipAddress):                         # If pinging the IP address succeeds
-            try:
-                self.labJackDriver = ue9.UE9(ipAddress=ipAddress,
-                                             ethernet=True)                 # Try to establish LabJack connection
-                self.ip.config(bg="green", fg="white")                      # Update the Entry box GUI (SUCCESS)
-                print("Connected to LabJack at", ipAddress)                 # Console -> print Connected...
-                self.reset()                                                # Call the reset method
-                self.emergencyBrake()                                       # Call the emergencyBrake method
-                self.statusOff()                                            # Call the statusOff method
-            except:                                                         # If the IP is not of a LabJack UE9
-                print("Failed to connect to LabJack at", ipAddress)         # Console -> print Failed...
-                self.ip.config(bg="red", fg="white")                        # Update the Entry box GUI (ERROR)
-                pass                                                        # Keep going
-        else:                                                               # If ping failed
-            print("Failed to connect to LabJack at", ipAddress)             # Console -> print Failed
+        if self.controller.connectAsync(ipAddress):                         # If a connect attempt was started
+            self.ip.config(bg="yellow", fg="black")                         # Update the Entry box GUI (WAITING)
+
+    def connectionChanged(self, connected):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is called by the controller when the LabJack connects,
+        fails to connect or loses its link
+        :param connected: This is True if the LabJack is connected
+        """
+        if connected:                                                       # If the LabJack is connected
+            self.ip.config(bg="green", fg="white")                          # Update the Entry box GUI (SUCCESS)
+        else:                                                               # If the LabJack is not connected
             self.ip.config(bg="red", fg="white")                            # Update the Entry box GUI (ERROR)
-    
+        self.updateButtons()                                                # Show the OFF state
+
+    def updateButtons(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to enable/disable the buttons and the slider
+        to match the controller. Only the widgets whose state changed are
+        reconfigured. Nothing can be turned on until a LabJack is connected
+        """
+        running = self.controller.motorRunning                              # Get the circuit operation
+        connected = self.controller.isConnected()                           # Get the LabJack connection
+        direction = self.controller.currentDirection                        # Get the H-Bridge direction
+        states = {self.btnON: ACTIVE if connected and not running else DISABLED,
+                  self.btnOFF: ACTIVE if running else DISABLED,
+                  self.btnForward: ACTIVE if running and
+                  direction != MotorController.FORWARD else DISABLED,
+                  self.btnBackward: ACTIVE if running and
+                  direction != MotorController.BACKWARD else DISABLED,
+                  self.speedSlider: (ACTIVE, 1) if running else (DISABLED, 0),
+                  self.rpm: NORMAL if running and
+                  self.controller.speedLoop is not None else DISABLED}
+        for widget, state in states.items():                                # For every button and the slider
+            if self.buttonStates.get(widget) == state:                      # If it already shows the state
+                continue                                                    # Skip the reconfigure
+            if widget is self.speedSlider:                                  # If it is the SPEED control slider
+                widget.config(state=state[0], showvalue=state[1])           # Enable/Disable and show/hide value
+            else:                                                           # If it is a button
+                widget.config(state=state)                                  # Enable/Disable the button
+            self.buttonStates[widget] = state                               # Hold the shown state
+
     def statusOn(self):
         """DOCUMENTATION GOES HERE"""
         """
         This function is used to turn the motor driver circuit on
         """
-        if self.eBrakePressed:                                              # If the E-Brake has been triggered
-            self.reset(True)                                                # Call the reset method and pass TRUE
-        else:                                                               # If the E-Brake was not triggered
-            self.btnON.config(state=DISABLED)                               # Disable the ON button
-            self.btnOFF.config(state=ACTIVE)                                # Enable the OFF button
-            self.btnBackward.config(state=ACTIVE)                           # Enable the BACKWARDS button
-            self.btnForward.config(state=ACTIVE)                            # Enable the FORWARDS button
-            self.speedSlider.config(state=ACTIVE, showvalue=1)              # Enable the SPEED control slider
-            self.motorRunning = True                                        # Set the circuit operation to TRUE
-            self.labJackDriver.timerCounter(TimerClockBase=1,               # Set Base Clk to System Clk (48Mhz)
-                                            TimerClockDivisor=1,            # Set Clock Divisor to 1
-                                            Timer0Mode=0,                   # Set Timer Mode to 16-bit (65,536)
-                                            NumTimersEnabled=1,             # Set the number of enabled timers
-                                            UpdateConfig=1,                 # Set Update Timer parameter to True
-                                            Timer0Value=self.previousTimerValue)    # Set the Timer Value
-            self.labJackFIOState = 0b11110                                  # Turn the Enable pin to low->Turn ON
-            self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,        # Set the UE9 pin Masks (Update)
-                                        FIODir=self.labJackFIODir,          # Set the UE9 pin Dirs (Direction)
-                                        FIOState=self.labJackFIOState)      # Set the UE9 pin States (HI or LOW)
-
-            print("Motor Driver is ON")                                     # Console -> print ON
-    
+        if not self.controller.turnOn() and self.controller.eBrakePressed:  # If the E-Brake has been triggered
+            self.controller.requestReset()                                  # Ask for the Reset password
+        self.updateButtons()                                                # Show the ON state
+
     def statusOff(self, turnOFF=False):
         """DOCUMENTATION GOES HERE"""
         """
@@ -220,70 +320,25 @@ class MotorDriver:
                         the Emergency Button being triggered.
                         It's value is False if the E-Brake button is used
         """
-        self.btnON.config(state=ACTIVE)                                     # Enable the ON button
-        self.btnOFF.config(state=DISABLED)                                  # Disable the OFF button
-        self.btnBackward.config(state=DISABLED)                             # Disable the BACKWARDS button
-        self.btnForward.config(state=DISABLED)                              # Disable the FORWARDS button
-        self.speedSlider.config(state=DISABLED, showvalue=0)                # Disable the SPEED control slider
-        if self.motorRunning:                                               # If the Driver (Motor) is ON
-            self.labJackDriver.timerCounter(TimerClockBase=1,               # Set Base Clk to System Clk (48Mhz)
-                                            TimerClockDivisor=1,            # Set Clock Divisor to 1
-                                            Timer0Mode=0,                   # Set Timer Mode to 16-bit (65,536)
-                                            NumTimersEnabled=0,             # Set the number of enabled timers
-                                            UpdateConfig=1,                 # Set Update Timer parameter to True
-                                            Timer0Value=0)                  # Set the Timer Value
-            self.labJackFIOState = 0b11111                                  # Turn the Enable pin to hi->Turn OFF
-            self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,        # Set the UE9 pin Masks (Update)
-                                        FIODir=self.labJackFIODir,          # Set the UE9 pin Dir (Direction)
-                                        FIOState=self.labJackFIOState)      # Set the UE9 pin States (HI or LOW)
-            self.motorRunning = False                                       # Set the circuit operation to FALSE
-        if turnOFF:                                                         # If the Turn Off button is used
-            self.previousDirection = 2                                      # Set the direction variable to NONE
-
-        print("Motor Driver is OFF")                                        # Console -> print OFF
-    
+        self.controller.turnOff(turnOFF)                                    # Call the turnOff method
+        self.updateButtons()                                                # Show the OFF state
+
     def forwardDirection(self):
         """DOCUMENTATION GOES HERE"""
         """
         This function is used to rotate the motor in the *forwards direction
         """
-        self.btnForward.config(state=DISABLED)                              # Disable the FORWARDS button
-        self.btnBackward.config(state=ACTIVE)                               # Enable the BACKWARDS button
-
-        self.labJackFIOState = 0b11111                                      # Turn the En, Frd, Brd pins to hi
-        self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                    FIODir=self.labJackFIODir,
-                                    FIOState=self.labJackFIOState)          # Turn Off the Driver
-        self.window.after(100)                                              # Wait 100 milli seconds
-        self.labJackFIOState = 0b11100                                      # Turn the En, Frd pins to low
-        self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                    FIODir=self.labJackFIODir,
-                                    FIOState=self.labJackFIOState)          # Turn On the Driver and go Forwards
-        self.previousDirection = 0                                          # Set the direction variable to frd
-        
-        print("Motor Driver in FORWARD Direction")                          # Console -> print FORWARDS
-    
+        self.controller.setDirection(MotorController.FORWARD)               # Go Forwards
+        self.updateButtons()                                                # Disable the FORWARDS button
+
     def backwardsDirection(self):
         """DOCUMENTATION GOES HERE"""
         """
         This function is used to rotate the motor in the *backwards direction
         """
-        self.btnForward.config(state=ACTIVE)                                # Enable the FORWARDS button
-        self.btnBackward.config(state=DISABLED)                             # Disable the BACKWARDS button
-
-        self.labJackFIOState = 0b11111                                      # Turn the En, Frd, Brd pins to hi
-        self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                    FIODir=self.labJackFIODir,
-                                    FIOState=self.labJackFIOState)          # Turn Off the Driver
-        self.window.after(100)                                              # Wait 100 milli seconds
-        self.labJackFIOState = 0b11010                                      # Turn the En, Brd pins to low
-        self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                    FIODir=self.labJackFIODir,
-                                    FIOState=self.labJackFIOState)          # Turn On the Driver and go Backwards
-        self.previousDirection = 1                                          # Set the direction variable to Brd
-        
-        print("Motor Driver in BACKWARDS Direction")                        # Console -> print BACKWARDS
-    
+        self.controller.setDirection(MotorController.BACKWARD)              # Go Backwards
+        self.updateButtons()                                                # Disable the BACKWARDS button
+
     def speedControl(self, dutyCycle):
         """DOCUMENTATION GOES HERE"""
         """
@@ -292,132 +347,140 @@ class MotorDriver:
                           obtained from the slider
         The PWM frequency is (732.421875 Hz)
         """
-        if self.motorRunning:
-            dCTimerValue = int(dutyCycle) * 655.35                          # Convert the D.C. -> Timer Value
-            self.labJackDriver.timerCounter(TimerClockBase=1,               # Set Base Clk to System Clk (48Mhz)
-                                            TimerClockDivisor=1,            # Set Clock Divisor to 1
-                                            Timer0Mode=0,                   # Set Timer Mode to 16-bit (65,536)
-                                            NumTimersEnabled=1,             # Set the number of enabled timers
-                                            UpdateConfig=1,                 # Set Update Timer parameter to True
-                                            Timer0Value=int(dCTimerValue))  # Set the Timer Value
-            self.previousTimerValue = int(dCTimerValue)                     # Update the timer value variable
-
-            print("Duty Cycle at", dutyCycle, "% =", self.previousTimerValue)   # Console -> print D.C.,TimerVal
-    
+        self.controller.setDutyCycle(dutyCycle)                             # Hand over the newest duty cycle
+
+    def rpmControl(self, event=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hold the motor at the RPM in the entry box
+        :param event: This is an event that is passed if the 'ENTER'
+                      key was pressed from within the RPM entry box
+        """
+        try:
+            rpm = float(self.rpm.get())                                     # Get the value from the RPM entry box
+        except ValueError:                                                  # If it is not a number
+            self.rpm.config(bg="red", fg="white")                           # Update the Entry box GUI (ERROR)
+            return
+        self.rpm.config(bg="white", fg="black")                             # Update the Entry box GUI (OK)
+        self.controller.setSpeed(rpm)                                       # Hold the RPM (closed loop)
+
     def emergencyBrake(self):
         """DOCUMENTATION GOES HERE"""
         """
-        This function is used to check if the emergency stop has been
-        triggered and if so, immediately stop the motor
-        """
-        ebrakecheck = self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                                  FIODir=self.labJackFIODir,
-                                                  FIOState=self.labJackFIOState)    # Get value from eBrake pin
-        if not ebrakecheck["FIOState"] & 0b01000 and self.motorRunning:     # If Circuit ON and E-Brake pressed
-            print("EMERGENCY BRAKE Triggered")                              # Console -> print EMERGENCY BRAKE
-
-            self.eBrakePressed = True                                       # Set Brake triggered variable True
-            self.statusOff()                                                # Call the statusOff function
-            self.eBrake = Toplevel()                                        # Set up a secondary window (eBrake)
-            self.eBrake.overrideredirect(True)                              # Remove the window (Min, Max, Exit)
-            self.eBrake.resizable(False, False)                             # Make the window un-resizable
-            self.eBrake.title("Brake")                                      # Set it's tittle to BRAKE
-            self.eBrake.grab_set()                                          # Take control away from main window
-            self.eBrake.geometry(
-                '+' + str(int(self.eBrake.winfo_screenwidth() / 2) -
-                          int(self.eBrake.winfo_screenwidth() / 4.5)) +
-                '+' + str(int(self.eBrake.winfo_screenheight() / 2) -
-                          int(self.eBrake.winfo_screenheight() / 24)))      # Set where the eBrake window appears
-            Label(self.eBrake,
-                  text="Emergency Brake Activated",
-                  font=("Courier", 24), fg="red",
-                  bg="black").pack(fill=BOTH)                               # Place a label in the eBrake window
-            brakeIcon = PhotoImage(file="brake.png")                        # Get an image for the eBrake button
-            btnBrake = Button(self.eBrake, image=brakeIcon,
-                              bg="black", bd=20,
-                              command=self.eBrake.destroy)                  # Create the button
-            btnBrake.image = brakeIcon                                      # Hold a reference to the brake image
-            btnBrake.pack(fill=BOTH)                                        # Place it in the eBrake window
-            self.eBrake.update()                                            # Update the eBrake window
-            btnBrake.flash()                                                # Flash the eBrake acknowledge button
-        self.window.after(10, self.emergencyBrake)                          # Reset to check every 10 milli sec
-    
-    def reset(self, turnON=False):
+        This function is called by the controller once the emergency stop
+        has been triggered (the motor is already stopped) to show the
+        eBrake window
+        """
+        self.updateButtons()                                                # Show the OFF state
+        if self.eBrake is None:                                             # If it was not built yet
+            self._buildBrakeWindow()                                        # Build the eBrake window
+        self.eBrake.deiconify()                                             # Show the eBrake window
+        self.eBrake.lift()                                                  # Put it on top of the main window
+        self.eBrake.grab_set()                                              # Take control away from main window
+        self.eBrake.update()                                                # Update the eBrake window
+        self.btnBrake.flash()                                               # Flash the eBrake acknowledge button
+
+    def closeBrake(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hide the eBrake window (kept for next time)
+        """
+        if self.eBrake is not None:                                         # If the eBrake window was built
+            self.eBrake.grab_release()                                      # Give control back to main window
+            self.eBrake.withdraw()                                          # Hide the eBrake window
+
+    def reset(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is called by the controller once the reset has been
+        triggered (Reset input or Turn ON button after the E-Brake) to ask
+        the user for the password and then reset (start) the motor
+        """
+        if self.eReset is None:                                             # If it was not built yet
+            self._buildResetWindow()                                        # Build the eReset window
+        self.password.delete(0, END)                                        # Clear the last password
+        self.password.config(bg="white", fg="black")                        # Update the Entry box GUI (NORMAL)
+        self.eReset.deiconify()                                             # Show the eReset window
+        self.eReset.lift()                                                  # Put it on top of the other windows
+        self.eReset.grab_set()                                              # Take control away from main window
+        self.password.focus()                                               # Set the focus on the password field
+        self.eReset.update()                                                # Update the eReset window
+        self.btnReset.flash()                                               # Flash the Reset button
+
+    def resetContinue(self, event=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to close the eReset window and start the motor
+        :param event: This is an event that is passed if the 'ENTER'
+                      key was pressed from within the PASSWORD entry box.
+                      It's value is 'None' if the Reset button is used
+        """
+        if self.controller.confirmReset(self.password.get()):               # If the password entered matches
+            self.closeBrake()                                               # Close the E-Brake window if active
+            self.updateButtons()                                            # Show the ON state and direction
+            self.eReset.grab_release()                                      # Give control back to main window
+            self.eReset.withdraw()                                          # Hide the eReset prompt window
+        else:                                                               # If the password doesn't match
+            self.password.config(bg="red", fg="white")                      # Update the Entry box GUI (ERROR)
+            self.eReset.update()                                            # Update the eReset window
+            self.btnReset.flash()                                           # Flash the Reset confirmation button
+            self.eReset.after(1000)                                         # Wait a 1 second
+            self.password.config(bg="white", fg="black")                    # Update the Entry box GUI (NORMAL)
+
+    def _buildBrakeWindow(self):
         """DOCUMENTATION GOES HERE"""
         """
-        This function is used to check if the reset has been triggered
-        and if so, check if the user has confirmed it in the GUI and then
-        reset (start) the motor
-        :param turnON: This is a boolean value used to check if the Turn ON
-                       button was used to start the Driver (Motor) after the
-                       Emergency Button was triggered.
-                       It's value is False if the Reset button is used
-        """
-        def resetContinue(event=None):
-            """DOCUMENTATION GOES HERE"""
-            """
-            This function is used to close the eReset window and start the motor
-            :param event: This is an event that is passed if the 'ENTER'
-                          key was pressed from within the PASSWORD entry box.
-                          It's value is 'None' if the Reset button is used
-            """
-            if self.password.get() == "go":                                 # If the password entered matches
-                self.eBrakePressed = False                                  # Set Brake triggered variable False
-                self.eBrake.destroy()                                       # Close the E-Brake window if active
-                self.statusOn()                                             # Call the statusOn function
-                if self.previousDirection == 1:                             # If the Direction Variable is 1
-                    self.backwardsDirection()                               # Go Backwards
-                elif self.previousDirection == 0:                           # If the Direction Variable is 0
-                    self.forwardDirection()                                 # Go Forwards
-                self.resetPressed = False                                   # Set Reset triggered variable False
-                eReset.destroy()                                            # Close the eReset prompt window
-            else:                                                           # If the password doesn't match
-                self.password.config(bg="red", fg="white")                  # Update the Entry box GUI (ERROR)
-                eReset.update()                                             # Update the eReset window
-                self.btnReset.flash()                                       # Flash the Reset confirmation button
-                eReset.after(1000)                                          # Wait a 1 second
-                self.password.config(bg="white", fg="black")                # Update the Entry box GUI (NORMAL)
-                
-        resetCheck = self.labJackDriver.feedback(FIOMask=self.labJackFIOMask,
-                                                 FIODir=self.labJackFIODir,
-                                                 FIOState=self.labJackFIOState)     # Get value from Reset pin
-        
-        if (not resetCheck["FIOState"] & 0b10000 and                        # If Reset was pressed **AND**
-                not self.motorRunning and                                   # Driver (Motor) is Off **AND**
-                not self.resetPressed and                                   # Reset variable is False **AND**
-                self.eBrakePressed) or turnON:                              # E-brake variable is True ***** OR
-                                                                            # turnON is True->Turn ON button used
-            print("RESET Triggered")                                        # Console -> print RESET
-
-            self.resetPressed = True                                        # Set Reset triggered variable True
-            eReset = Toplevel()                                             # Set up a secondary window (eReset)
-            eReset.resizable(False, False)                                  # Make the window un-resizable
-            eReset.overrideredirect(True)                                   # Remove the window (Min, Max, Exit)
-            eReset.title("Reset")                                           # Set it's tittle to RESET
-            eReset.grab_set()                                               # Take control away from main window
-            eReset.geometry(
-                '+' + str(int(eReset.winfo_screenwidth() / 2) -
-                          int(eReset.winfo_screenwidth() / 4.3)) +
-                '+' + str(int(eReset.winfo_screenheight() / 2) -
-                          int(eReset.winfo_screenheight() / 24)))           # Set where the eReset window appears
-            Label(eReset, text="Reset. Enter your password to continue...",
-                  font=("Courier", 15), fg="white",
-                  bg="black").pack(fill=BOTH)                               # Place a label in the eReset window
-            self.password = Entry(eReset, bd=6, relief=RIDGE,
-                                  justify=CENTER, show="*")                 # Create a password Entry box
-            self.password.bind("<Return>", resetContinue)                   # Bind the ENTER key to call a method
-            self.password.pack(fill=BOTH)                                   # Place it in the eReset window
-            resetIcon = PhotoImage(file="reset.png")                        # Get an image for the eReset button
-            self.btnReset = Button(eReset, image=resetIcon,
-                                   bg="black", bd=10,
-                                   command=resetContinue)                   # Create the button
-            self.btnReset.image = resetIcon                                 # Hold a reference to the reset image
-            self.btnReset.pack(fill=BOTH)                                   # Place it in the eReset window
-            self.password.focus()                                           # Set the focus on the password field
-            eReset.update()                                                 # Update the eReset window
-            self.btnReset.flash()                                           # Flash the Reset button
-        self.window.after(10, self.reset)                                   # Reset to check every 10 milli sec
+        This function is used to build the eBrake window once, hidden
+        """
+        self.eBrake = Toplevel()                                            # Set up a secondary window (eBrake)
+        self.eBrake.withdraw()                                              # Keep it hidden until the E-Brake
+        self.eBrake.overrideredirect(True)                                  # Remove the window (Min, Max, Exit)
+        self.eBrake.resizable(False, False)                                 # Make the window un-resizable
+        self.eBrake.title("Brake")                                          # Set it's tittle to BRAKE
+        self.eBrake.geometry(
+            '+' + str(int(self.eBrake.winfo_screenwidth() / 2) -
+                      int(self.eBrake.winfo_screenwidth() / 4.5)) +
+            '+' + str(int(self.eBrake.winfo_screenheight() / 2) -
+                      int(self.eBrake.winfo_screenheight() / 24)))          # Set where the eBrake window appears
+        Label(self.eBrake,
+              text="Emergency Brake Activated",
+              font=("Courier", 24), fg="red",
+              bg="black").pack(fill=BOTH)                                   # Place a label in the eBrake window
+        self.btnBrake = Button(self.eBrake, image=self.images.get("brake.png"),
+                               bg="black", bd=20,
+                               command=self.closeBrake)                     # Create the button
+        self.btnBrake.pack(fill=BOTH)                                       # Place it in the eBrake window
+
+    def _buildResetWindow(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to build the eReset window once, hidden
+        """
+        self.eReset = Toplevel()                                            # Set up a secondary window (eReset)
+        self.eReset.withdraw()                                              # Keep it hidden until the Reset
+        self.eReset.resizable(False, False)                                 # Make the window un-resizable
+        self.eReset.overrideredirect(True)                                  # Remove the window (Min, Max, Exit)
+        self.eReset.title("Reset")                                          # Set it's tittle to RESET
+        self.eReset.geometry(
+            '+' + str(int(self.eReset.winfo_screenwidth() / 2) -
+                      int(self.eReset.winfo_screenwidth() / 4.3)) +
+            '+' + str(int(self.eReset.winfo_screenheight() / 2) -
+                      int(self.eReset.winfo_screenheight() / 24)))          # Set where the eReset window appears
+        Label(self.eReset, text="Reset. Enter your password to continue...",
+              font=("Courier", 15), fg="white",
+              bg="black").pack(fill=BOTH)                                   # Place a label in the eReset window
+        self.password = Entry(self.eReset, bd=6, relief=RIDGE,
+                              justify=CENTER, show="*")                     # Create a password Entry box
+        self.password.bind("<Return>", self.resetContinue)                  # Bind the ENTER key to call a method
+        self.password.pack(fill=BOTH)                                       # Place it in the eReset window
+        self.btnReset = Button(self.eReset, image=self.images.get("reset.png"),
+                               bg="black", bd=10,
+                               command=self.resetContinue)                  # Create the button
+        self.btnReset.pack(fill=BOTH)                                       # Place it in the eReset window
 # End of Class
 
 
-dCMotorDriver = MotorDriver()                                               # Create an instance(Run the Program)
+if __name__ == "__main__":
+    configureLogging()                                                      # Write the log to the console
+    dCMotorDriver = MotorDriver()                                           # Create an instance
+    dCMotorDriver.run()                                                     # Run the Program
@@ -0,0 +1,213 @@
+"""
+Description : This is the source code for the acceleration/deceleration ramps of the Motor Driver.
+              Instead of jumping the PWM timer (start, stop, speed change, reversal) the duty cycle
+              follows a ramp, so the motor current never spikes and trips the supply.
+
+              PROFILE       |   Duty cycle over time
+              --------------------------------------
+              trapezoid     |   straight line at rampRate (% per second)
+              s-curve       |   smooth start and end (3u^2 - 2u^3), never steeper than rampRate
+
+              A ramp is sent as the fewest Timer0Value-only updates the profile needs: one update
+              per step (1 % by default), timed at the moment the profile crosses that step. The
+              RampScheduler runs them on the worker's timers, so the input scans (and the E-Brake)
+              keep running and an E-Brake aborts the ramp at once. A lost update is skipped, the
+              ramp goes on with the next one (and its then function), so it never stalls.
+"""
+
+import math                                                                 # Library for the S-curve timing
+import time                                                                 # Library for the ramp clock
+from instrumentation import logger                                          # Library for the levelled log
+from speed_control import dutyToTimerValue                                  # Library for the duty cycle table
+
+
+class RampProfile:
+    TRAPEZOID = "trapezoid"                                                 # Profile -> straight line
+    S_CURVE = "s-curve"                                                     # Profile -> smooth start and end
+    # shape                     Passed in the __init__ method               # Variable for the profile shape
+    # rate                      Passed in the __init__ method               # Variable for the duty cycle %/sec
+    # step                      Passed in the __init__ method               # Variable for the duty cycle % per update
+
+    def __init__(self, shape=TRAPEZOID, rate=100, step=1):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the RampProfile object
+        :param shape: This is RampProfile.TRAPEZOID or RampProfile.S_CURVE
+        :param rate: This is the steepest duty cycle change in % per second
+        :param step: This is the duty cycle change per timer update in %
+        """
+        if shape not in (self.TRAPEZOID, self.S_CURVE):                     # If the shape is not known
+            raise ValueError("Unknown ramp profile: " + str(shape))
+        if rate <= 0 or step <= 0:                                          # If the rate or step is not positive
+            raise ValueError("rate and step must be greater than 0")
+        self.shape = shape                                                  # Set the profile shape
+        self.rate = rate                                                    # Set the duty cycle %/sec
+        self.step = step                                                    # Set the duty cycle % per update
+
+    def duration(self, startValue, endValue):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get how long a ramp takes
+        :param startValue: This is the Timer0Value the ramp starts at
+        :param endValue: This is the Timer0Value the ramp ends at
+        :return: The ramp time in milli seconds
+        """
+        change = abs(endValue - startValue) / 655.35                        # Get the duty cycle change (%)
+        if self.shape == self.S_CURVE:                                      # If it is an S-curve
+            return 1500 * change / self.rate                                # Its steepest part is 1.5x the average
+        return 1000 * change / self.rate
+
+    def updates(self, startValue, endValue):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the timer updates of a ramp, one per
+        step, at the time the profile reaches it. The last one is endValue
+        :param startValue: This is the Timer0Value the ramp starts at
+        :param endValue: This is the Timer0Value the ramp ends at
+        :return: A list of (milli seconds from the start, Timer0Value)
+        """
+        if startValue == endValue:                                          # If there is nothing to ramp
+            return []
+        duration = self.duration(startValue, endValue)                      # Get the ramp time
+        startDuty, endDuty = startValue / 655.35, endValue / 655.35
+        steps = max(1, int(math.ceil(abs(endDuty - startDuty) / self.step - 0.01)))   # Timer Values are whole
+        updates = []
+        for number in range(1, steps + 1):                                  # For every step of the ramp
+            fraction = min(1.0, number * self.step / abs(endDuty - startDuty))
+            value = endValue if number == steps else dutyToTimerValue(
+                startDuty + (endDuty - startDuty) * fraction)               # Get the Timer Value of the step
+            updates.append((duration * self._timeOf(fraction), value))      # Send it when the profile gets there
+        return updates
+
+    def _timeOf(self, fraction):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get when the profile reaches a fraction of
+        the ramp (the inverse of the profile)
+        :param fraction: This is the fraction of the change (0 -> 1)
+        :return: The fraction of the ramp time (0 -> 1)
+        """
+        if self.shape == self.S_CURVE:                                      # If it is an S-curve (3u^2 - 2u^3)
+            return 0.5 - math.sin(math.asin(1 - 2 * fraction) / 3)          # Solve it for u
+        return fraction
+# End of Class
+
+
+class RampScheduler:
+    # labJackWorker             Passed in the __init__ method               # Variable for the UE9 I/O thread
+    # motorOutputs              Passed in the __init__ method               # Variable for the UE9 output state
+    # profile                   Passed in the __init__ method               # Variable for the ramp profile
+    # running                   Created in the __init__ method              # Variable for the ramp state
+    # targetValue               Created in the start method                 # Variable for the Timer Value ramped to
+    # rampsCompleted            Created in the __init__ method              # Variable for the finished ramps
+    # rampsAborted              Created in the __init__ method              # Variable for the aborted ramps
+    # updatesSent               Created in the __init__ method              # Variable for the timer updates sent
+    # updatesFailed             Created in the __init__ method              # Variable for the timer updates lost
+
+    def __init__(self, labJackWorker, motorOutputs, profile):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the RampScheduler object (no ramp running)
+        :param labJackWorker: This is the LabJackWorker that runs the timers
+        :param motorOutputs: This is the MotorOutputs that sends the timer
+        :param profile: This is the RampProfile of every ramp
+        """
+        self.labJackWorker = labJackWorker                                  # Hold a reference to the I/O thread
+        self.motorOutputs = motorOutputs                                    # Hold a reference to the outputs
+        self.profile = profile                                              # Hold the ramp profile
+        self.running = False                                                # Start with no ramp running
+        self.targetValue = None                                             # Start with no Timer Value ramped to
+        self.rampsCompleted = 0                                             # Start with no finished ramps
+        self.rampsAborted = 0                                               # Start with no aborted ramps
+        self.updatesSent = 0                                                # Start with no timer updates sent
+        self.updatesFailed = 0                                              # Start with no timer updates lost
+        self._sequence = 0                                                  # Number of the running ramp
+
+    def start(self, labJackDriver, targetValue, then=None, delay=0):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to ramp the timer from its value on the UE9 to
+        a new value. A running ramp is replaced. It runs on the worker thread
+        :param labJackDriver: This is the LabJack connection
+        :param targetValue: This is the Timer0Value to ramp to
+        :param then: This is a function called as then(labJackDriver) on the
+                     worker thread when the ramp ends (not if it is aborted)
+        :param delay: This is the wait before the ramp starts in milli seconds
+        """
+        self.abort()                                                        # Replace a running ramp
+        self.running = True                                                 # Set a ramp as running
+        self.targetValue = targetValue                                      # Hold the Timer Value ramped to
+        updates = self.profile.updates(self.motorOutputs.timerValue, targetValue)
+        startTime = time.monotonic() + delay / 1000                         # Get the time the ramp starts
+        self._next(labJackDriver, self._sequence, startTime, updates, then)
+
+    def abort(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop a running ramp at once (e.g. E-Brake).
+        The timer keeps the value it has
+        """
+        if self.running:                                                    # If a ramp is running
+            self.rampsAborted += 1                                          # Count the aborted ramp
+        self.running = False                                                # Set no ramp as running
+        self._sequence += 1                                                 # Forget the waiting updates
+
+    def _next(self, labJackDriver, sequence, startTime, updates, then):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to wait for the next update of the ramp, or to
+        end it if there are no more updates
+        :param labJackDriver: This is the LabJack connection
+        :param sequence: This is the number of the ramp
+        :param startTime: This is the time.monotonic() the ramp started at
+        :param updates: These are the (milli seconds, Timer Value) left
+        :param then: This is the function called when the ramp ends
+        """
+        if not updates:                                                     # If the ramp is done
+            delay = max(0, (startTime - time.monotonic()) * 1000)           # Wait for a delayed empty ramp
+            self.labJackWorker.callLater(delay, self._finish, sequence, then)
+            return
+        dueTime = startTime + updates[0][0] / 1000                          # Get the time of the next update
+        self.labJackWorker.callLater(max(0, (dueTime - time.monotonic()) * 1000),
+                                     self._step, sequence, startTime, updates, then)
+
+    def _step(self, labJackDriver, sequence, startTime, updates, then):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to send one update of the ramp. It does
+        nothing if the ramp was aborted. A failed update is logged and the
+        ramp goes on, so a lost packet never leaves it running forever
+        :param labJackDriver: This is the LabJack connection
+        :param sequence: This is the number of the ramp that scheduled it
+        :param startTime: This is the time.monotonic() the ramp started at
+        :param updates: These are the (milli seconds, Timer Value) left
+        :param then: This is the function called when the ramp ends
+        """
+        if sequence != self._sequence:                                      # If the ramp was aborted
+            return
+        now = time.monotonic()
+        while len(updates) > 1 and startTime + updates[1][0] / 1000 <= now: # If the worker was late
+            updates = updates[1:]                                           # Skip to the newest due update
+        try:
+            self.motorOutputs.apply(labJackDriver, timerValue=updates[0][1])    # Send the Timer Value only
+            self.updatesSent += 1                                           # Count the timer update
+        except Exception as error:                                          # If the UE9 packet failed
+            self.updatesFailed += 1                                         # Count the lost timer update
+            logger.warning("Ramp update failed: %s", error)                 # Log -> Failed...
+        self._next(labJackDriver, sequence, startTime, updates[1:], then)   # Wait for the next update
+
+    def _finish(self, labJackDriver, sequence, then):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to end the ramp and call its then function
+        :param labJackDriver: This is the LabJack connection
+        :param sequence: This is the number of the ramp that scheduled it
+        :param then: This is the function called when the ramp ends
+        """
+        if sequence != self._sequence:                                      # If the ramp was aborted
+            return
+        self.running = False                                                # Set no ramp as running
+        self.rampsCompleted += 1                                            # Count the finished ramp
+        if then is not None:                                                # If something waits for the ramp
+            then(labJackDriver)
+# End of Class
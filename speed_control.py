@@ -0,0 +1,190 @@
+"""
+Description : This is the source code for the closed loop speed control of the Motor Driver. The
+              motor speed is read from an encoder on the UE9 Counter0 input and a PI controller on
+              the UE9 I/O thread sets the duty cycle at a fixed control rate to hold an RPM setpoint.
+
+              The duty cycle -> Timer0Value conversion is a table made once (0.1 % steps), the PI
+              output is clamped to the duty cycle range without winding up the integral and its
+              change per second is limited, so the timer never jumps.
+
+              The UE9 puts Counter0 on the first FIO pin after the enabled timers (FIO1 with the
+              PWM timer on FIO0). On this board FIO1 drives Motor Terminal 1 (Forward), so the
+              MotorController refuses the closed loop unless Forward is moved off FIO1 (FIO1 not
+              an output in labJackFIODir) and the encoder is wired to FIO1 instead.
+"""
+
+import time                                                                 # Library for the control period
+
+DUTY_STEPS = 10                                                             # Table steps per duty cycle %
+DUTY_TIMER_TABLE = tuple(int(step / DUTY_STEPS * 655.35)
+                         for step in range(100 * DUTY_STEPS + 1))           # Duty cycle (0.1 %) -> Timer Value
+
+
+def dutyToTimerValue(dutyCycle):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to convert a duty cycle to a Timer0Value with the
+    table (no multiplication per update)
+    :param dutyCycle: This is the duty cycle from 0 to 100 %
+    :return: The Timer0Value (dutyCycle * 655.35, 0.1 % steps)
+    """
+    step = int(round(dutyCycle * DUTY_STEPS))                               # Get the table step
+    return DUTY_TIMER_TABLE[min(max(step, 0), len(DUTY_TIMER_TABLE) - 1)]   # Clamp it to the table
+
+
+class PIController:
+    # kp                        Passed in the __init__ method               # Variable for the proportional gain
+    # ki                        Passed in the __init__ method               # Variable for the integral gain
+    # outputMin                 Passed in the __init__ method               # Variable for the lowest duty cycle
+    # outputMax                 Passed in the __init__ method               # Variable for the highest duty cycle
+    # maxRate                   Passed in the __init__ method               # Variable for the duty cycle %/sec
+    # integral                  Created in the __init__ method              # Variable for the integral part
+    # output                    Created in the __init__ method              # Variable for the last duty cycle
+
+    def __init__(self, kp=0.01, ki=0.2, outputMin=30, outputMax=100, maxRate=50):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the PIController object
+        :param kp: This is the proportional gain (% duty per RPM)
+        :param ki: This is the integral gain (% duty per RPM per second)
+        :param outputMin: This is the lowest duty cycle (%)
+        :param outputMax: This is the highest duty cycle (%)
+        :param maxRate: This is the largest duty cycle change per second (%)
+        """
+        self.kp = kp                                                        # Set the proportional gain
+        self.ki = ki                                                        # Set the integral gain
+        self.outputMin = outputMin                                          # Set the lowest duty cycle
+        self.outputMax = outputMax                                          # Set the highest duty cycle
+        self.maxRate = maxRate                                              # Set the duty cycle %/sec
+        self.integral = outputMin                                           # Start the integral at the minimum
+        self.output = outputMin                                             # Start the output at the minimum
+
+    def reset(self, output):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to start the controller from the duty cycle on
+        the UE9, so taking over does not make the timer jump
+        :param output: This is the duty cycle on the UE9 (%)
+        """
+        output = min(max(output, self.outputMin), self.outputMax)           # Clamp it to the duty cycle range
+        self.integral = output                                              # Hold it in the integral part
+        self.output = output                                                # Start from it
+
+    def update(self, setpoint, measured, period):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the next duty cycle. The integral does
+        not grow while the output is held at the end of the duty cycle range
+        and never leaves the range (anti-windup). The change per update is
+        limited to maxRate
+        :param setpoint: This is the RPM asked for
+        :param measured: This is the RPM read from the encoder
+        :param period: This is the time since the last update in seconds
+        :return: The new duty cycle (%)
+        """
+        error = setpoint - measured                                         # Get the speed error
+        integral = self.integral + self.ki * error * period                 # Get the new integral part
+        output = self.kp * error + integral                                 # Get the PI output
+        if (output > self.outputMax and error > 0) or (output < self.outputMin and error < 0):
+            integral = self.integral                                        # Held at the range -> keep the integral
+        self.integral = min(max(integral, self.outputMin), self.outputMax)  # Keep the integral in the range
+        output = min(max(self.kp * error + self.integral, self.outputMin), self.outputMax)
+        step = self.maxRate * period                                        # Get the largest change allowed
+        self.output = min(max(output, self.output - step), self.output + step)  # Limit the change (rate)
+        return self.output
+# End of Class
+
+
+class ClosedLoopSpeed:
+    # labJackWorker             Passed in the __init__ method               # Variable for the UE9 I/O thread
+    # motorOutputs              Passed in the __init__ method               # Variable for the UE9 output state
+    # pulsesPerRevolution       Passed in the __init__ method               # Variable for the encoder pulses/rev
+    # controlRate               Passed in the __init__ method               # Variable for the updates per second
+    # controller                Passed in the __init__ method               # Variable for the PI controller
+    # setpoint                  Created in the __init__ method              # Variable for the RPM asked for
+    # rpm                       Created in the __init__ method              # Variable for the RPM read
+    # running                   Created in the __init__ method              # Variable for the loop state
+    # updates                   Created in the __init__ method              # Variable for the control updates
+
+    def __init__(self, labJackWorker, motorOutputs, pulsesPerRevolution,
+                 controlRate=50, controller=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the ClosedLoopSpeed object (not running)
+        :param labJackWorker: This is the LabJackWorker that runs the loop
+        :param motorOutputs: This is the MotorOutputs that sends the timer
+        :param pulsesPerRevolution: This is the encoder pulses per turn
+        :param controlRate: This is the number of control updates per second
+        :param controller: This is the PIController (default gains if None)
+        """
+        self.labJackWorker = labJackWorker                                  # Hold a reference to the I/O thread
+        self.motorOutputs = motorOutputs                                    # Hold a reference to the outputs
+        self.pulsesPerRevolution = pulsesPerRevolution                      # Set the encoder pulses/rev
+        self.controlRate = controlRate                                      # Set the updates per second
+        self.controller = controller or PIController()                      # Hold the PI controller
+        self.setpoint = 0.0                                                 # Start with no RPM asked for
+        self.rpm = 0.0                                                      # Start with no RPM read
+        self.running = False                                                # Start with the loop stopped
+        self.updates = 0                                                    # Start with no control updates
+        self._sequence = 0                                                  # Number of the running loop
+        self._lastCount = None                                              # The last Counter0 read
+        self._lastTime = None                                               # The time of the last read
+
+    def start(self, labJackDriver, setpoint):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to hold a new RPM setpoint. A stopped loop is
+        started from the duty cycle on the UE9. It runs on the worker thread
+        :param labJackDriver: This is the LabJack connection
+        :param setpoint: This is the RPM asked for
+        """
+        self.setpoint = setpoint                                            # Hold the RPM asked for
+        if self.running:                                                    # If the loop is already running
+            return                                                          # It uses the setpoint next update
+        self.controller.reset(self.motorOutputs.timerValue / 655.35)        # Start from the duty cycle now
+        self.running = True                                                 # Set the loop as running
+        self._sequence += 1                                                 # Start a new loop
+        self._lastCount = None                                              # Read a new first count
+        self._update(labJackDriver, self._sequence)                         # Run the first update now
+
+    def stop(self, labJackDriver=None):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to stop the loop at once (e.g. E-Brake or the
+        duty cycle set by hand). The timer keeps its last value
+        :param labJackDriver: This is the LabJack connection (worker command)
+        """
+        self.running = False                                                # Set the loop as stopped
+        self._sequence += 1                                                 # Forget the waiting update
+
+    def _update(self, labJackDriver, sequence):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to read the encoder, run the PI controller and
+        send the new Timer0Value if it changed, then wait for the next update.
+        The next update is scheduled even if a packet fails, so the loop
+        never stalls with running set
+        :param labJackDriver: This is the LabJack connection
+        :param sequence: This is the number of the loop that scheduled it
+        """
+        if sequence != self._sequence or not self.running:                  # If the loop was stopped
+            return
+        start = time.monotonic()                                            # Get the time of this update
+        try:
+            count = labJackDriver.feedback(FIOMask=0)["Counter0"]           # Read the encoder count
+            if self._lastCount is not None:                                 # If there is a count to compare to
+                period = start - self._lastTime                             # Get the time since the last read
+                pulses = (count - self._lastCount) & 0xFFFFFFFF             # Get the pulses (32-bit counter)
+                self.rpm = pulses / self.pulsesPerRevolution / period * 60  # Convert the pulses -> RPM
+                dutyCycle = self.controller.update(self.setpoint, self.rpm, period)
+                self.motorOutputs.apply(labJackDriver,
+                                        timerValue=dutyToTimerValue(dutyCycle)) # Send the Timer Value (if changed)
+                self.updates += 1                                           # Count the control update
+            self._lastCount = count                                         # Hold the count for the next update
+            self._lastTime = start                                          # Hold the time of the count
+        finally:                                                            # Even if the UE9 packet failed
+            interval = 1000 / self.controlRate                              # Get the time between updates
+            elapsed = (time.monotonic() - start) * 1000                     # Get the time this update took
+            self.labJackWorker.callLater(max(0, interval - elapsed),
+                                         self._update, sequence)            # Run the next update on time
+# End of Class
@@ -0,0 +1,267 @@
+"""
+Description : This is the source code for the telemetry recorder of the Motor Driver. Every input
+              scan (FIOState), the commanded Timer0Value, the H-Bridge direction and a timestamp
+              go into a ring buffer that is created once (array columns, no memory is allocated
+              per sample). The buffer is written to an append-only binary file in one write when
+              it is full or every flushInterval seconds (so a crash loses at most that much), and
+              a long run can be recorded and read back later (e.g. after an E-Brake). A UE9
+              stream block (16 scans per read) is added in one bulk copy with recordBlock.
+
+              FILE LAYOUT (little endian)
+              --------------------------------------
+              header    |   b"UE9TLM01"
+              block     |   b"BLK0", uint32 count, then the columns of count samples:
+                        |   float64 time (sec since epoch), uint16 timerValue,
+                        |   uint8 fioState, int8 direction
+
+              readTelemetry loads a log as NumPy arrays (or array columns without NumPy).
+
+              python telemetry.py motor.tlm                         (print a summary of a log)
+"""
+
+import array                                                                # Library for the sample columns
+import struct                                                               # Library for the block headers
+import sys                                                                  # Library for the byte order
+import threading                                                            # Library for the buffer lock
+import time                                                                 # Library for the timestamps
+try:
+    import numpy                                                            # Library for reading long logs
+except ImportError:                                                         # If NumPy is not installed
+    numpy = None                                                            # Read the logs into arrays
+
+FILE_HEADER = b"UE9TLM01"                                                   # Start of every telemetry file
+BLOCK_HEADER = struct.Struct("<4sI")                                        # Block marker and sample count
+BLOCK_MARKER = b"BLK0"
+COLUMNS = (("time", "d"), ("timerValue", "H"),
+           ("fioState", "B"), ("direction", "b"))                           # Column names and array types
+
+
+class TelemetryRecorder:
+    # path                      Passed in the __init__ method               # Variable for the log file (or None)
+    # capacity                  Passed in the __init__ method               # Variable for the samples per block
+    # flushInterval             Passed in the __init__ method               # Variable for the secs between writes
+    # columns                   Created in the __init__ method              # Variable for the sample columns
+    # samplesRecorded           Created in the __init__ method              # Variable for the samples recorded
+    # blocksWritten             Created in the __init__ method              # Variable for the file writes
+
+    def __init__(self, path=None, capacity=4096, flushInterval=2.0):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function initializes the TelemetryRecorder object and creates
+        the ring buffer (and the log file)
+        :param path: This is the path of the log file. It's value is None to
+                     only keep the newest capacity samples in memory
+        :param capacity: This is the number of samples in the ring buffer
+                         (written to the file in one block when full)
+        :param flushInterval: This is the longest time in seconds a sample
+                              waits in the buffer before it is written
+        """
+        self.path = path                                                    # Hold the log file path
+        self.capacity = capacity                                            # Hold the samples per block
+        self.flushInterval = flushInterval                                  # Hold the secs between file writes
+        self.columns = {name: array.array(typecode, bytes(array.array(typecode).itemsize * capacity))
+                        for name, typecode in COLUMNS}                      # Create the columns once (zeros)
+        self.samplesRecorded = 0                                            # Start with no samples
+        self.blocksWritten = 0                                              # Start with no file writes
+        self._index = 0                                                     # The next sample in the buffer
+        self._wrapped = False                                               # The buffer was not filled yet
+        self._lock = threading.Lock()                                       # Lock for the buffer and file
+        self._file = None                                                   # The log file (not open)
+        self._lastWrite = time.monotonic()                                  # The time of the last file write
+        if path is not None:                                                # If the samples are logged
+            self._file = open(path, "ab")                                   # Open the log for appending
+            if self._file.tell() == 0:                                      # If it is a new log
+                self._file.write(FILE_HEADER)                               # Write the file header
+
+    def record(self, fioState, timerValue, direction):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a sample to the ring buffer. It runs on
+        the UE9 I/O thread after every input scan, and writes the buffer to
+        the log when it is full or flushInterval has passed
+        :param fioState: This is the FIO state byte read by the input scan
+        :param timerValue: This is the commanded PWM timer value (0 if off)
+        :param direction: This is the H-Bridge direction (MotorController)
+        """
+        columns = self.columns
+        with self._lock:
+            index = self._index
+            columns["time"][index] = time.time()                            # Set the sample time
+            columns["timerValue"][index] = timerValue                       # Set the commanded Timer Value
+            columns["fioState"][index] = fioState                           # Set the FIO state read
+            columns["direction"][index] = direction                         # Set the H-Bridge direction
+            self.samplesRecorded += 1                                       # Count the sample
+            self._index = index + 1                                         # Move to the next sample
+            self._writeIfDue()                                              # Write the buffer if full or due
+
+    def recordBlock(self, fioStates, timerValue, direction, interval):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to add a block of scans to the ring buffer in
+        bulk copies (one per column, split where the buffer wraps). It runs
+        on the UE9 I/O thread after every stream read. The last scan gets
+        the time now and each scan before it one interval earlier
+        :param fioStates: This is the FIO state of every scan as bytes
+        :param timerValue: This is the commanded PWM timer value (0 if off)
+        :param direction: This is the H-Bridge direction (MotorController)
+        :param interval: This is the time between two scans in seconds
+        """
+        columns = self.columns
+        count = len(fioStates)
+        lastTime = time.time()                                              # The time of the last scan
+        with self._lock:
+            start = 0
+            while start < count:                                            # Until every scan is in the buffer
+                index = self._index
+                size = min(count - start, self.capacity - index)            # Scans that fit before the end
+                end = index + size
+                columns["time"][index:end] = array.array("d", (lastTime - (count - 1 - scan) * interval
+                                                               for scan in range(start, start + size)))
+                columns["timerValue"][index:end] = array.array("H", (timerValue,)) * size
+                columns["fioState"][index:end] = array.array("B", fioStates[start:start + size])
+                columns["direction"][index:end] = array.array("b", (direction,)) * size
+                self.samplesRecorded += size                                # Count the samples
+                self._index = end                                           # Move past the samples
+                start += size
+                self._writeIfDue()                                          # Write the buffer if full or due
+
+    def flush(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the samples not yet in the log file
+        """
+        with self._lock:
+            if self._file is None or not self._index:                       # If there is nothing to write
+                return
+            self._writeBlock(self._index)                                   # Write the samples recorded so far
+            self._index = 0                                                 # Start over at the front
+
+    def latest(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to get the samples held in memory, oldest first
+        (the newest capacity samples when there is no log file)
+        :return: A dictionary with an array for every column
+        """
+        with self._lock:
+            if self._file is not None or not self._wrapped:                 # If the buffer starts at the front
+                return {name: column[:self._index] for name, column in self.columns.items()}
+            return {name: column[self._index:] + column[:self._index]
+                    for name, column in self.columns.items()}               # Put the oldest samples first
+
+    def close(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the last samples and close the log
+        """
+        self.flush()                                                        # Write the last samples
+        with self._lock:
+            if self._file is not None:                                      # If the log is open
+                self._file.close()                                          # Close the log file
+                self._file = None
+
+    def _writeIfDue(self):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the buffer to the log when it is full
+        or flushInterval has passed (the lock is held)
+        """
+        if self._index == self.capacity:                                    # If the buffer is full
+            self._writeBlock(self.capacity)                                 # Write it to the log (if any)
+            self._index = 0                                                 # Start over at the front
+            self._wrapped = True                                            # The buffer was filled
+        elif (self._file is not None and
+              time.monotonic() - self._lastWrite >= self.flushInterval):    # If the samples waited too long
+            self._writeBlock(self._index)                                   # Write the samples recorded so far
+            self._index = 0                                                 # Start over at the front
+
+    def _writeBlock(self, count):
+        """DOCUMENTATION GOES HERE"""
+        """
+        This function is used to write the first count samples of every
+        column to the log file in one block (the lock is held)
+        :param count: This is the number of samples to write
+        """
+        if self._file is None:                                              # If the samples are not logged
+            return
+        parts = [BLOCK_HEADER.pack(BLOCK_MARKER, count)]
+        for name, typecode in COLUMNS:                                      # For every column
+            column = self.columns[name]
+            if count < self.capacity or sys.byteorder != "little":          # If only part of it is written
+                column = column[:count]                                     # Copy the samples written
+                if sys.byteorder != "little":                               # If this is a big endian machine
+                    column.byteswap()                                       # The log is little endian
+            parts.append(column)
+        self._file.write(b"".join(parts))                                   # Write the block in one write
+        self._file.flush()                                                  # Hand the block to the OS
+        self._lastWrite = time.monotonic()                                  # Start the next flush interval
+        self.blocksWritten += 1                                             # Count the file write
+# End of Class
+
+
+def readTelemetry(path):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is used to load a telemetry log
+    :param path: This is the path of the log file
+    :return: A dictionary with a column for every name in COLUMNS. The
+             columns are NumPy arrays (array.array if NumPy is missing)
+    """
+    with open(path, "rb") as logFile:
+        data = logFile.read()                                               # Read the whole log at once
+    if not data.startswith(FILE_HEADER):                                    # If it is not a telemetry log
+        raise ValueError("Not a telemetry log: " + str(path))
+    blocks = {name: [] for name, typecode in COLUMNS}
+    offset = len(FILE_HEADER)
+    while offset + BLOCK_HEADER.size <= len(data):                          # For every block in the log
+        marker, count = BLOCK_HEADER.unpack_from(data, offset)
+        if marker != BLOCK_MARKER:                                          # If the block is damaged
+            raise ValueError("Damaged telemetry block at byte " + str(offset))
+        offset += BLOCK_HEADER.size
+        size = count * sum(array.array(typecode).itemsize for name, typecode in COLUMNS)
+        if offset + size > len(data):                                       # If the last block was cut short
+            break                                                           # Keep the complete blocks
+        for name, typecode in COLUMNS:                                      # For every column of the block
+            length = count * array.array(typecode).itemsize
+            blocks[name].append(data[offset:offset + length])               # Keep the column bytes
+            offset += length
+    if numpy is not None:                                                   # If NumPy is installed
+        dtypes = {"d": "<f8", "H": "<u2", "B": "u1", "b": "i1"}
+        return {name: numpy.frombuffer(b"".join(blocks[name]), dtype=dtypes[typecode])
+                for name, typecode in COLUMNS}
+    columns = {}
+    for name, typecode in COLUMNS:                                          # For every column
+        column = array.array(typecode, b"".join(blocks[name]))
+        if sys.byteorder != "little":                                       # If this is a big endian machine
+            column.byteswap()                                               # The log is little endian
+        columns[name] = column
+    return columns
+
+
+def main(argv=None):
+    """DOCUMENTATION GOES HERE"""
+    """
+    This function is the command line entry point. It prints a summary of
+    every telemetry log
+    :param argv: These are the log paths (sys.argv if None)
+    :return: The exit code (0 -> OK)
+    """
+    for path in (sys.argv[1:] if argv is None else argv):                   # For every log
+        columns = readTelemetry(path)
+        count = len(columns["time"])
+        if not count:                                                       # If the log is empty
+            print(path, "0 samples")
+            continue
+        duration = columns["time"][-1] - columns["time"][0]
+        if numpy is not None:                                               # If NumPy is installed
+            brakeSamples = int(numpy.count_nonzero(columns["fioState"] & 0b01000 == 0))
+        else:
+            brakeSamples = sum(1 for fioState in columns["fioState"] if not fioState & 0b01000)
+        print(path, count, "samples over %.1f s" % duration,
+              "(%.1f samples/s)," % (count / duration if duration else 0.0),
+              brakeSamples, "with the E-Brake pressed")                     # Console -> print the summary
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())